@@ -6,35 +6,87 @@ from flask import (
     redirect,
     url_for,
     send_from_directory,
+    Response,
 )
 import os
+import sys
+import logging
+import time
+import threading
 from datetime import datetime, timedelta
 import pytz
-from mutagen.mp3 import MP3
-from mutagen.id3 import ID3
-from mutagen.id3._frames import COMM
-from mutagen.id3._frames import TYER
-from mutagen.id3._frames import TCON
-from mutagen.id3._frames import TALB
-from mutagen.id3._frames import TPE1
-from mutagen.id3._frames import TIT2
+import recorder
 from recorder import (
+    config_store,
     load_config,
     save_config,
     get_next_7_days_schedule,
 )
-import psutil
 import shutil
-from recorder import load_config, get_next_7_days_schedule
-import humanize
+from catalog import get_mp3_tags
+from response_cache import ResponseCache, cached_response
+from config_store import ConfigError, StaleConfigError
+from stream_probe import get_prober
+from retag import RetagManager, TAG_FRAMES, matches, write_tags
+from archive_stream import stream_tar, stream_zip
+from feeds import build_feed
+from chapters import delete_sidecar
 
 app = Flask(__name__)
 
 
-config = load_config()
+# Set by setup() on the first request
+BASE_DIR = None
+OUTPUT_DIR = None
+catalog = None
+lease_store = None
+retag_manager = None
+setup_lock = threading.Lock()
 
-BASE_DIR = config.get("base_dir", os.path.dirname(os.path.abspath(__file__)))
-OUTPUT_DIR = config.get("output_dir", os.path.join(BASE_DIR, "recordings"))
+# How long a rendered status page may be reused (CPU/memory figures change)
+STATUS_CACHE_SECONDS = 5
+
+# Podcast apps poll every show's feed, so feeds get their own cache rather
+# than pushing the pages out of the shared one
+FEED_CACHE_ENTRIES = 512
+
+response_cache = ResponseCache()
+feed_cache = ResponseCache(max_entries=FEED_CACHE_ENTRIES)
+
+
+def setup():
+    """Load the configuration and open the catalog shared with the recorder."""
+    global BASE_DIR, OUTPUT_DIR, catalog, lease_store, retag_manager
+    with setup_lock:
+        if catalog is not None:
+            return
+        recorder.configure(process="web")
+        BASE_DIR = recorder.BASE_DIR
+        OUTPUT_DIR = recorder.OUTPUT_DIR
+        lease_store = recorder.lease_store
+        retag_manager = RetagManager(recorder.catalog)
+        catalog = recorder.catalog
+
+
+@app.before_request
+def ensure_setup():
+    if catalog is None:
+        setup()
+
+
+@app.errorhandler(ConfigError)
+def config_error(e):
+    logging.error(str(e))
+    return f"Radiojoe can't read its configuration: {e}", 500
+
+
+def config_version():
+    return config_store.version()
+
+
+STALE_CONFIG_MESSAGE = (
+    "The schedule was changed in another window. Reload the page and try again."
+)
 
 
 def get_recordings():
@@ -48,13 +100,15 @@ def get_recordings():
 
 @app.route("/")
 def index():
+    # The page shows the current time to the minute and sorts by next occurrence
+    version = (config_version(), int(time.time() // 60))
+    return cached_response(response_cache, "index", version, render_index)
+
+
+def render_index():
     config = load_config()
     shows = config["shows"]
 
-    # Add the config index to each show
-    for i, show in enumerate(shows):
-        show["config_index"] = i
-
     # Get current time in Chicago (America/Chicago)
     chicago_tz = pytz.timezone("America/Chicago")
     now = datetime.now(chicago_tz)
@@ -97,36 +151,39 @@ def serve_recording(filename):
     return send_from_directory(recordings_dir, filename)
 
 
-def get_mp3_tags(file_path):
-    audio = MP3(file_path, ID3=ID3)
-    tags = {}
-    if audio.tags:
-        tags["title"] = str(audio.tags.get("TIT2", [""])[0])
-        tags["artist"] = str(audio.tags.get("TPE1", [""])[0])
-        tags["album"] = str(audio.tags.get("TALB", [""])[0])
-        tags["genre"] = str(audio.tags.get("TCON", [""])[0])
-        tags["year"] = str(audio.tags.get("TYER", [""])[0])
-        tags["comment"] = str(audio.tags.get("COMM", [""])[0])
-    return tags
+@app.route("/recordings/search")
+def search_recordings():
+    query = request.args.get("q", "").strip()
+    page = max(request.args.get("page", 1, type=int), 1)
+    per_page = min(max(request.args.get("per_page", 50, type=int), 1), 500)
+    results, total = catalog.search(query, limit=per_page, offset=(page - 1) * per_page)
+    return jsonify(
+        {
+            "query": query,
+            "page": page,
+            "per_page": per_page,
+            "total": total,
+            "results": results,
+        }
+    )
 
 
 @app.route("/recordings")
 def recordings():
-    recordings_dir = OUTPUT_DIR
-    recordings = []
-    for file in os.listdir(recordings_dir):
-        if file.endswith(".mp3"):
-            file_path = os.path.join(recordings_dir, file)
-            tags = get_mp3_tags(file_path)
-            date = datetime.fromtimestamp(os.path.getmtime(file_path)).strftime(
-                "%Y-%m-%d %H:%M:%S"
-            )
-            recordings.append({"filename": file, "tags": tags, "date": date})
-
-    # Sort recordings by date (newest first)
-    recordings.sort(key=lambda x: x["date"], reverse=True)
-
-    return render_template("recordings.html", recordings=recordings)
+    query = request.args.get("q", "").strip()
+    if query:
+        results, total = catalog.search(query, limit=500)
+        return render_template(
+            "recordings.html", recordings=results, query=query, total=total
+        )
+    return cached_response(
+        response_cache,
+        "recordings",
+        catalog.version(),
+        lambda: render_template(
+            "recordings.html", recordings=catalog.list_recordings()
+        ),
+    )
 
 
 @app.route("/edit_tags/<path:filename>", methods=["GET", "POST"])
@@ -135,26 +192,132 @@ def edit_tags(filename):
     file_path = os.path.join(recordings_dir, filename)
 
     if request.method == "POST":
-        audio = MP3(file_path, ID3=ID3)
-        if audio.tags is None:
-            audio.tags = ID3()
-
-        audio.tags["TIT2"] = TIT2(encoding=3, text=request.form["title"])
-        audio.tags["TPE1"] = TPE1(encoding=3, text=request.form["artist"])
-        audio.tags["TALB"] = TALB(encoding=3, text=request.form["album"])
-        audio.tags["TCON"] = TCON(encoding=3, text=request.form["genre"])
-        audio.tags["TYER"] = TYER(encoding=3, text=request.form["year"])
-        audio.tags["COMM"] = COMM(
-            encoding=3, lang="eng", desc="comment", text=request.form["comment"]
-        )
-
-        audio.save()
+        write_tags(file_path, {field: request.form[field] for field in TAG_FRAMES})
+        catalog.update(filename)
         return redirect(url_for("recordings"))
 
     tags = get_mp3_tags(file_path)
     return render_template("edit_tags.html", filename=filename, tags=tags)
 
 
+@app.route("/retag", methods=["POST"])
+def bulk_retag():
+    """Start a bulk tag edit.
+
+    Expects JSON like ``{"filter": {"show": "KEXP", "date_from": "2024-01-01",
+    "tags": {"artist": "Old Name"}}, "changes": {"artist": "New Name"}}``.
+    """
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({"success": False, "message": "Expected a JSON object"}), 400
+    changes = data.get("changes") or {}
+    if not changes:
+        return jsonify({"success": False, "message": "No changes given"}), 400
+    try:
+        # Rejects malformed filters and changes
+        job = retag_manager.submit(data.get("filter") or {}, changes)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    response = jsonify(job.to_dict())
+    response.status_code = 202
+    response.headers["Location"] = url_for("retag_progress", job_id=job.id)
+    return response
+
+
+@app.route("/retag/<job_id>")
+def retag_progress(job_id):
+    job = retag_manager.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "message": "Job not found"}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route("/download_recordings", methods=["GET", "POST"])
+def download_recordings():
+    """Stream several recordings as one ZIP or TAR archive (no compression).
+
+    Takes the selected ``files``, or a filter made of ``show``, ``date_from``
+    and ``date_to``, plus ``format`` (``zip`` or ``tar``).
+    """
+    archive_format = request.values.get("format", "zip")
+    if archive_format not in ("zip", "tar"):
+        return "Unknown archive format", 400
+
+    selected = set(request.values.getlist("files"))
+    filters = {
+        key: request.values[key]
+        for key in ("show", "date_from", "date_to")
+        if request.values.get(key)
+    }
+    if not selected and not filters:
+        return "Select recordings or give a filter", 400
+
+    # Only files known to the catalog can be downloaded
+    if selected:
+        recordings = [
+            recording
+            for recording in catalog.list_recordings()
+            if recording["filename"] in selected
+        ]
+    else:
+        recordings = [
+            recording
+            for recording in catalog.list_recordings()
+            if matches(recording, filters)
+        ]
+    if not recordings:
+        return "No matching recordings", 404
+
+    files = [
+        (recording["filename"], os.path.join(OUTPUT_DIR, recording["filename"]))
+        for recording in recordings
+    ]
+    if archive_format == "tar":
+        size, chunks = stream_tar(files)
+        response = Response(chunks, mimetype="application/x-tar")
+        response.content_length = size
+    else:
+        response = Response(stream_zip(files), mimetype="application/zip")
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    archive_name = f"radiojoe_recordings_{timestamp}.{archive_format}"
+    response.headers["Content-Disposition"] = f'attachment; filename="{archive_name}"'
+    return response
+
+
+@app.route("/feeds/<show>.xml")
+def show_feed(show):
+    """Podcast RSS feed of a show's recordings, regenerated only when they change."""
+    signature = catalog.show_signature(show)
+    show_config = next(
+        (s for s in load_config()["shows"] if s["name"] == show), None
+    )
+    if show_config is None and signature[0] == 0:
+        return "Show not found", 404
+
+    def render():
+        return build_feed(
+            show,
+            catalog.show_recordings(show),
+            show_config or {},
+            feed_url=request.url,
+            link=url_for("recordings", q=show, _external=True),
+            enclosure_url=lambda filename: url_for(
+                "serve_recording", filename=filename, _external=True
+            ),
+        )
+
+    version = (signature, config_version())
+    return cached_response(
+        feed_cache,
+        ("feed", show, request.host_url),
+        version,
+        render,
+        mimetype="application/rss+xml",
+        last_modified=True,
+    )
+
+
 @app.route("/delete_recording/<path:filename>", methods=["POST"])
 def delete_recording(filename):
     recordings_dir = OUTPUT_DIR
@@ -162,6 +325,8 @@ def delete_recording(filename):
 
     if os.path.exists(file_path):
         os.remove(file_path)
+        delete_sidecar(file_path)
+        catalog.remove(filename)
         return jsonify({"success": True, "message": "Recording deleted successfully"})
     else:
         return jsonify({"success": False, "message": "Recording not found"}), 404
@@ -170,34 +335,38 @@ def delete_recording(filename):
 # Add a new route for exporting all recordings
 @app.route("/export_recordings", methods=["GET"])
 def export_recordings():
-    recordings_dir = OUTPUT_DIR
+    return cached_response(
+        response_cache,
+        "export_recordings",
+        catalog.version(),
+        render_export_recordings,
+        mimetype="application/json",
+    )
+
+
+def render_export_recordings():
     recordings = []
-    for file in os.listdir(recordings_dir):
-        if file.endswith(".mp3"):
-            file_path = os.path.join(recordings_dir, file)
-            tags = get_mp3_tags(file_path)
-            date = datetime.fromtimestamp(os.path.getmtime(file_path)).strftime(
-                "%Y-%m-%d %H:%M:%S"
-            )
-            recordings.append(
-                {
-                    "filename": file,
-                    "title": tags.get("title", ""),
-                    "artist": tags.get("artist", ""),
-                    "album": tags.get("album", ""),
-                    "genre": tags.get("genre", ""),
-                    "year": tags.get("year", ""),
-                    "date": date,
-                }
-            )
+    for recording in catalog.list_recordings():
+        tags = recording["tags"]
+        recordings.append(
+            {
+                "filename": recording["filename"],
+                "title": tags.get("title", ""),
+                "artist": tags.get("artist", ""),
+                "album": tags.get("album", ""),
+                "genre": tags.get("genre", ""),
+                "year": tags.get("year", ""),
+                "date": recording["date"],
+            }
+        )
 
-    return jsonify(recordings)
+    return jsonify(recordings).get_data()
 
 
 @app.route("/add_show", methods=["GET", "POST"])
 def add_show():
     if request.method == "POST":
-        config = load_config()
+        config, version = config_store.snapshot()
         new_show = {
             "name": request.form["name"],
             "url": request.form["url"],
@@ -210,23 +379,35 @@ def add_show():
             "genre": request.form["genre"],
         }
         config["shows"].append(new_show)
-        save_config(config)
+        try:
+            save_config(config, version)
+        except StaleConfigError:
+            return STALE_CONFIG_MESSAGE, 409
         return redirect(url_for("index"))
     return render_template("add_show.html")
 
 
-@app.route("/edit_show/<int:index>", methods=["GET", "POST"])
-def edit_show(index):
-    config = load_config()
-    if index < 0 or index >= len(config["shows"]):
+@app.route("/edit_show/<show_id>", methods=["GET", "POST"])
+def edit_show(show_id):
+    config, version = config_store.snapshot()
+    index = next(
+        (i for i, show in enumerate(config["shows"]) if show.get("id") == show_id),
+        None,
+    )
+    if index is None:
         return "Show not found", 404
 
     show = config["shows"][index]
 
     if request.method == "POST":
+        # Reject edits made against a config that has since changed
+        expected_version = request.form.get("version", version)
         if "delete" in request.form:
             del config["shows"][index]
-            save_config(config)
+            try:
+                save_config(config, expected_version)
+            except StaleConfigError:
+                return STALE_CONFIG_MESSAGE, 409
             return redirect(url_for("index"))
         else:
             show["name"] = request.form["name"]
@@ -249,7 +430,10 @@ def edit_show(index):
             show["artist"] = request.form["artist"]
             show["album"] = request.form["album"]
             show["genre"] = request.form["genre"]
-            save_config(config)
+            try:
+                save_config(config, expected_version)
+            except StaleConfigError:
+                return STALE_CONFIG_MESSAGE, 409
             return redirect(url_for("index"))
 
     # Convert time from HH:MM AM/PM format to HH:MM format for the form
@@ -260,11 +444,61 @@ def edit_show(index):
     end_time = time_obj + timedelta(seconds=show["duration"])
     show["end_time"] = end_time.strftime("%H:%M")
 
-    return render_template("edit_show.html", show=show, index=index)
+    return render_template("edit_show.html", show=show, version=version)
+
+
+@app.route("/stream_health")
+def stream_health():
+    config = load_config()
+    probes = get_prober().check([show["url"] for show in config["shows"]])
+    health = {}
+    for show in config["shows"]:
+        probe = probes[show["url"]]
+        health[show["id"]] = {
+            "name": show["name"],
+            "url": show["url"],
+            "final_url": probe.final_url,
+            "ok": probe.ok,
+            "status": probe.symbol,
+            "detail": probe.summary,
+        }
+    return jsonify(health)
+
+
+@app.template_filter("timestamp")
+def format_timestamp(value):
+    return datetime.fromtimestamp(value).strftime("%Y-%m-%d %H:%M:%S")
+
+
+@app.route("/trace/<path:filename>")
+def recording_trace(filename):
+    trace = catalog.get_trace(filename)
+    if trace is None:
+        return "No trace recorded for this file", 404
+    if request.args.get("format") == "json":
+        return jsonify(trace)
+    return render_template("trace.html", filename=filename, trace=trace)
+
+
+@app.route("/traces")
+def traces_summary():
+    """Capture timings grouped by show and hour, to spot chronic lag."""
+    days = request.args.get("days", 30, type=int)
+    since = time.time() - days * 86400 if days > 0 else None
+    return jsonify(catalog.trace_summary(since))
 
 
 @app.route("/status")
 def status():
+    version = (
+        catalog.version(),
+        config_version(),
+        int(time.time() // STATUS_CACHE_SECONDS),
+    )
+    return cached_response(response_cache, "status", version, render_status)
+
+
+def render_status():
     config = load_config()
     recordings_dir = OUTPUT_DIR
 
@@ -277,22 +511,20 @@ def status():
         "percent": f"{used * 100 // total}%",
     }
 
+    # Imported here rather than at startup, as only this page needs them
+    import humanize
+    import psutil
+
     # Get CPU and memory usage
     cpu_usage = f"{psutil.cpu_percent()}%"
     memory = psutil.virtual_memory()
     memory_usage = f"{memory.percent}%"
 
     # Get the last recorded file
-    recordings = [f for f in os.listdir(recordings_dir) if f.endswith(".mp3")]
-    last_recording = (
-        max(recordings, key=lambda f: os.path.getmtime(os.path.join(recordings_dir, f)))
-        if recordings
-        else None
-    )
+    latest = catalog.latest()
+    last_recording = latest["filename"] if latest else None
     if last_recording:
-        last_recording_time = datetime.fromtimestamp(
-            os.path.getmtime(os.path.join(recordings_dir, last_recording))
-        )
+        last_recording_time = datetime.fromtimestamp(latest["mtime"])
         last_recording_time = pytz.timezone("America/Chicago").localize(
             last_recording_time
         )
@@ -329,11 +561,17 @@ def status():
         "last_recording": last_recording or "No recordings yet",
         "next_recording": next_recording or "No upcoming recordings",
         "next_recording_relative": next_recording_relative or "N/A",
-        "total_recordings": len(recordings),
+        "total_recordings": catalog.count(),
+        "nodes": lease_store.nodes() if lease_store else [],
     }
 
     return render_template("status.html", status=status_info)
 
 
 if __name__ == "__main__":
+    try:
+        setup()
+    except ConfigError as e:
+        print(f"Error: {e}. Exiting.")
+        sys.exit(1)
     app.run(debug=False)
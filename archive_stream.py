@@ -0,0 +1,100 @@
+import os
+import tarfile
+import time
+import zipfile
+
+
+CHUNK_SIZE = 256 * 1024
+TAR_BLOCK = 512
+
+
+class _ChunkSink:
+    """Write-only, unseekable file object whose output is collected in chunks.
+
+    zipfile falls back to streaming mode (data descriptors after each entry)
+    when the output has no ``tell``/``seek``.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        chunks, self._chunks = self._chunks, []
+        return chunks
+
+
+def stream_zip(files):
+    """Yield a stored (uncompressed) ZIP of ``files``, a list of (arcname, path).
+
+    Only one chunk of one file is held in memory at a time.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        for arcname, path in files:
+            stat = os.stat(path)
+            info = zipfile.ZipInfo(arcname, time.localtime(stat.st_mtime)[:6])
+            info.compress_type = zipfile.ZIP_STORED
+            info.file_size = stat.st_size
+            with open(path, "rb") as source, archive.open(info, mode="w") as target:
+                while True:
+                    chunk = source.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    target.write(chunk)
+                    yield from sink.drain()
+            yield from sink.drain()
+    yield from sink.drain()
+
+
+def _tar_header(arcname, stat):
+    info = tarfile.TarInfo(arcname)
+    info.size = stat.st_size
+    info.mtime = int(stat.st_mtime)
+    info.mode = 0o644
+    return info.tobuf(format=tarfile.PAX_FORMAT)
+
+
+def _tar_padding(size):
+    return (TAR_BLOCK - size % TAR_BLOCK) % TAR_BLOCK
+
+
+def stream_tar(files):
+    """Build an uncompressed TAR of ``files``, a list of (arcname, path).
+
+    Returns ``(size, chunks)``: the exact archive size, for Content-Length,
+    and a generator of its bytes. Sizes are taken when this is called, so a
+    file that grows afterwards is cut off at that size.
+    """
+    entries = [(arcname, path, os.stat(path)) for arcname, path in files]
+    size = 2 * TAR_BLOCK
+    for arcname, path, stat in entries:
+        size += len(_tar_header(arcname, stat)) + stat.st_size
+        size += _tar_padding(stat.st_size)
+    return size, _tar_chunks(entries)
+
+
+def _tar_chunks(entries):
+    for arcname, path, stat in entries:
+        yield _tar_header(arcname, stat)
+        remaining = stat.st_size
+        with open(path, "rb") as source:
+            while remaining > 0:
+                chunk = source.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+        # Keep the archive consistent if the file shrank meanwhile
+        while remaining > 0:
+            filler = min(CHUNK_SIZE, remaining)
+            remaining -= filler
+            yield b"\0" * filler
+        yield b"\0" * _tar_padding(stat.st_size)
+    yield b"\0" * (2 * TAR_BLOCK)
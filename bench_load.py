@@ -0,0 +1,529 @@
+"""Synthetic-load benchmarks for the web catalog and concurrent recording.
+
+``catalog`` generates directories of small tagged MP3s (1k/10k/100k by
+default) and times the catalog index and the ``/recordings``,
+``/export_recordings``, ``/status`` and tag-editing paths, each size in a
+fresh interpreter. ``streams`` records hundreds of simulated stations at once
+from a local stand-in server and measures start lag, CPU per stream, RSS,
+bytes the server had to drop and track chapters per recording (exiting with
+status 1 if recordings come back short of chapters). Results are printed as
+JSON:
+
+    python bench_load.py catalog --sizes 1000,10000 > bench_output.txt
+    python bench_load.py streams --stations 200 --duration 30
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from datetime import datetime, timedelta
+
+
+# One silent MPEG-1 Layer III frame, 128 kbps at 44.1 kHz
+SILENT_FRAME = b"\xff\xfb\x90\x64" + b"\x00" * 413
+SHOW_COUNT = 50
+GENRES = ["Jazz", "Rock", "Electronic", "Folk", "Talk"]
+
+
+def summarize_ms(values):
+    values = sorted(values)
+    if not values:
+        return {}
+    if len(values) > 1:
+        p95 = statistics.quantiles(values, n=20, method="inclusive")[-1]
+    else:
+        p95 = values[0]
+    return {
+        "count": len(values),
+        "median_ms": round(statistics.median(values) * 1000, 2),
+        "p95_ms": round(p95 * 1000, 2),
+        "max_ms": round(values[-1] * 1000, 2),
+    }
+
+
+def write_config(directory, **extra):
+    config = {
+        "base_dir": directory,
+        "output_dir": os.path.join(directory, "recordings"),
+        "log_file": os.path.join(directory, "recorder.log"),
+        "status_file": os.path.join(directory, "radiojoe_status.json"),
+        "catalog_file": os.path.join(directory, "radiojoe_catalog.db"),
+        "shows": [],
+        **extra,
+    }
+    os.makedirs(config["output_dir"], exist_ok=True)
+    path = os.path.join(directory, "config.json")
+    with open(path, "w") as f:
+        json.dump(config, f)
+    return path
+
+
+# Catalog benchmark
+
+
+def generate_recordings(output_dir, count, frames=2):
+    """Write ``count`` tagged MP3s named and dated like real recordings."""
+    from mutagen.id3 import ID3
+    from mutagen.id3._frames import COMM, TALB, TCON, TIT2, TPE1, TYER
+
+    audio = SILENT_FRAME * frames
+    first = datetime(2020, 1, 1, 20, 0)
+    for i in range(count):
+        show = f"Show {i % SHOW_COUNT:02d}"
+        when = first + timedelta(minutes=30 * i)
+        tags = ID3()
+        tags.add(TIT2(encoding=3, text=f"{show} - {when:%B %d, %Y - %I:%M %p}"))
+        tags.add(TPE1(encoding=3, text=f"Artist {i % 997}"))
+        tags.add(TALB(encoding=3, text=f"{show} Archive"))
+        tags.add(TCON(encoding=3, text=GENRES[i % len(GENRES)]))
+        tags.add(TYER(encoding=3, text=str(when.year)))
+        tags.add(COMM(encoding=3, lang="eng", desc="comment", text=f"Episode {i}"))
+        header = io.BytesIO()
+        tags.save(header, padding=lambda info: 256)
+
+        path = os.path.join(output_dir, f"{show}_{when:%Y%m%d_%H%M%S}.mp3")
+        with open(path, "wb") as f:
+            f.write(header.getvalue())
+            f.write(audio)
+        timestamp = when.timestamp()
+        os.utime(path, (timestamp, timestamp))
+
+
+def timed(client, path, method="GET", **kwargs):
+    headers = {"Accept-Encoding": "gzip", **kwargs.pop("headers", {})}
+    started = time.perf_counter()
+    response = client.open(path, method=method, headers=headers, **kwargs)
+    elapsed = time.perf_counter() - started
+    return {
+        "ms": round(elapsed * 1000, 2),
+        "status": response.status_code,
+        "bytes": len(response.data),
+    }, response
+
+
+def bench_catalog_size(args):
+    """Time the web app against one generated directory (run in a subprocess)."""
+    os.environ["RADIOJOE_CONFIG_FILE"] = args.config
+    import app
+    import psutil
+
+    results = {}
+    started = time.perf_counter()
+    app.setup()
+    app.catalog.refresh(force=True)
+    results["index_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    started = time.perf_counter()
+    app.catalog.refresh(force=True)
+    results["reindex_unchanged_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+    client = app.app.test_client()
+    for path in ("/recordings", "/export_recordings", "/status"):
+        cold, response = timed(client, path)
+        warm, _ = timed(client, path)
+        revalidated, _ = timed(
+            client, path, headers={"If-None-Match": response.headers.get("ETag", "")}
+        )
+        results[path] = {"cold": cold, "warm": warm, "revalidated": revalidated}
+    results["/recordings/search"], _ = timed(client, "/recordings/search?q=Artist+42")
+
+    filenames = [r["filename"] for r in app.catalog.list_recordings(refresh=False)]
+    step = max(len(filenames) // args.edits, 1)
+    edit_times = []
+    for filename in filenames[::step][: args.edits]:
+        form = {
+            "title": f"Edited {filename}",
+            "artist": "Bench Artist",
+            "album": "Bench Album",
+            "genre": "Bench",
+            "year": "2024",
+            "comment": "edited by bench_load.py",
+        }
+        started = time.perf_counter()
+        client.post(f"/edit_tags/{filename}", data=form)
+        edit_times.append(time.perf_counter() - started)
+    results["edit_tags"] = summarize_ms(edit_times)
+    results["/recordings_after_edit"], _ = timed(client, "/recordings")
+
+    started = time.perf_counter()
+    response = client.post(
+        "/retag", json={"filter": {"show": "Show 07"}, "changes": {"genre": "Bulk"}}
+    )
+    job_url = response.headers["Location"]
+    while True:
+        job = client.get(job_url).get_json()
+        if job["status"] == "finished":
+            break
+        time.sleep(0.05)
+    results["bulk_retag"] = {
+        "files": job["total"],
+        "failed": len(job["failed"]),
+        "ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+    results["rss_mb"] = round(psutil.Process().memory_info().rss / 2**20, 1)
+    print(json.dumps(results))
+
+
+def bench_catalog(args):
+    results = []
+    for size in [int(size) for size in args.sizes.split(",")]:
+        directory = tempfile.mkdtemp(
+            prefix=f"radiojoe-bench-{size}-", dir=args.workdir
+        )
+        try:
+            config_path = write_config(directory)
+            started = time.perf_counter()
+            generate_recordings(os.path.join(directory, "recordings"), size)
+            generated = time.perf_counter() - started
+            output = subprocess.run(
+                [
+                    sys.executable,
+                    os.path.abspath(__file__),
+                    "catalog-size",
+                    "--config",
+                    config_path,
+                    "--edits",
+                    str(args.edits),
+                ],
+                cwd=directory,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            result["generate_ms"] = round(generated * 1000, 2)
+            results.append({"recordings": size, **result})
+        finally:
+            if not args.keep:
+                shutil.rmtree(directory, ignore_errors=True)
+    return {"catalog": results}
+
+
+# Stand-in stream server
+
+
+class StandInServer:
+    """Serves any number of simulated stations at ``/station/<name>``.
+
+    Each connection gets silent MP3 at ``bitrate`` kbps in real time, with
+    ICY metadata (a new ``StreamTitle`` every ``title_every`` seconds) when
+    the client asks for it. Audio a slow client can't take is dropped, as a
+    live station would, once ``buffer_limit`` bytes are queued for it.
+    ``/stats`` returns per-station counters as JSON.
+    """
+
+    def __init__(
+        self, bitrate=128, metaint=16000, title_every=10, buffer_limit=65536
+    ):
+        self.byte_rate = bitrate * 1000 // 8
+        self.metaint = metaint
+        self.title_every = title_every
+        self.buffer_limit = buffer_limit
+        self.audio = SILENT_FRAME * 64
+        self.stats = {}
+
+    async def handle(self, reader, writer):
+        try:
+            request = await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            writer.close()
+            return
+        lines = request.decode(errors="replace").split("\r\n")
+        path = lines[0].split(" ")[1] if len(lines[0].split(" ")) > 1 else "/"
+        headers = {
+            name.strip().lower(): value.strip()
+            for name, _, value in (line.partition(":") for line in lines[1:] if line)
+        }
+
+        if path == "/stats":
+            body = json.dumps(self.stats).encode()
+            writer.write(
+                b"HTTP/1.0 200 OK\r\nContent-Type: application/json\r\n"
+                + f"Content-Length: {len(body)}\r\n\r\n".encode()
+                + body
+            )
+            await writer.drain()
+            writer.close()
+            return
+
+        station = path.rstrip("/").rsplit("/", 1)[-1]
+        stats = self.stats.setdefault(
+            station,
+            {"connected_at": time.time(), "connections": 0, "sent": 0, "dropped": 0},
+        )
+        stats["connections"] += 1
+        icy = headers.get("icy-metadata") == "1"
+        response = [
+            "HTTP/1.0 200 OK",
+            "Content-Type: audio/mpeg",
+            f"icy-name: {station}",
+            f"icy-br: {self.byte_rate * 8 // 1000}",
+        ]
+        if icy:
+            response.append(f"icy-metaint: {self.metaint}")
+        writer.write(("\r\n".join(response) + "\r\n\r\n").encode())
+        await self.stream(writer, station, stats, icy)
+
+    async def stream(self, writer, station, stats, icy):
+        started = time.monotonic()
+        produced = 0
+        offset = 0
+        until_meta = self.metaint
+        last_title = None
+        while not writer.transport.is_closing():
+            elapsed = time.monotonic() - started
+            due = int(elapsed * self.byte_rate) - produced
+            if due > 0:
+                produced += due
+                repeats = due // len(self.audio) + 2
+                chunk = (self.audio * repeats)[offset : offset + due]
+                offset = (offset + due) % len(self.audio)
+                if writer.transport.get_write_buffer_size() > self.buffer_limit:
+                    stats["dropped"] += due
+                else:
+                    if icy:
+                        track = int(elapsed // self.title_every) + 1
+                        title = f"{station} - Track {track}"
+                        framed = []
+                        while chunk:
+                            part, chunk = chunk[:until_meta], chunk[until_meta:]
+                            framed.append(part)
+                            until_meta -= len(part)
+                            if until_meta == 0:
+                                framed.append(self.metadata_block(title, last_title))
+                                last_title = title
+                                until_meta = self.metaint
+                        chunk = b"".join(framed)
+                    writer.write(chunk)
+                    stats["sent"] += due
+            await asyncio.sleep(0.1)
+        stats["disconnected_at"] = time.time()
+
+    @staticmethod
+    def metadata_block(title, last_title):
+        if title == last_title:
+            return b"\x00"
+        payload = f"StreamTitle='{title}';".encode()
+        payload += b"\x00" * (-len(payload) % 16)
+        return bytes([len(payload) // 16]) + payload
+
+
+async def serve(port, **options):
+    server = StandInServer(**options)
+    listener = await asyncio.start_server(
+        server.handle, "127.0.0.1", port, backlog=1024
+    )
+    print(listener.sockets[0].getsockname()[1], flush=True)
+    async with listener:
+        await listener.serve_forever()
+
+
+# Stream benchmark
+
+
+def bench_streams(args):
+    import psutil
+
+    directory = tempfile.mkdtemp(prefix="radiojoe-bench-streams-", dir=args.workdir)
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            os.path.abspath(__file__),
+            "serve",
+            "--port",
+            "0",
+            "--bitrate",
+            str(args.bitrate),
+            "--title-every",
+            str(args.title_every),
+        ],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        port = int(server.stdout.readline())
+        os.environ["RADIOJOE_CONFIG_FILE"] = write_config(directory)
+        import recorder
+
+        recorder.configure()
+        process = psutil.Process()
+        finished = []
+        all_finished = threading.Event()
+        finished_lock = threading.Lock()
+
+        def on_finish(recorded_file):
+            with finished_lock:
+                finished.append(recorded_file)
+                if len(finished) == args.stations:
+                    all_finished.set()
+
+        peaks = {"children_rss": 0, "recorder_rss": 0, "children": 0}
+        sampling = threading.Event()
+
+        def sample():
+            while not sampling.wait(0.5):
+                # Only count ffmpeg: the stand-in server is a child as well
+                children = []
+                rss = 0
+                for child in process.children(recursive=True):
+                    try:
+                        if child.name() == "ffmpeg":
+                            rss += child.memory_info().rss
+                            children.append(child)
+                    except psutil.Error:
+                        pass
+                peaks["children_rss"] = max(peaks["children_rss"], rss)
+                peaks["children"] = max(peaks["children"], len(children))
+                peaks["recorder_rss"] = max(
+                    peaks["recorder_rss"], process.memory_info().rss
+                )
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+        children_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+        self_before = process.cpu_times()
+
+        output_dir = recorder.OUTPUT_DIR
+        requested = {}
+        wall_started = time.monotonic()
+        for i in range(args.stations):
+            name = f"station-{i:04d}"
+            requested[name] = time.time()
+            recorder.record_stream(
+                name,
+                f"http://127.0.0.1:{port}/station/{name}",
+                args.duration,
+                output_dir,
+                {},
+                on_finish=on_finish,
+            )
+        all_finished.wait(args.duration + args.timeout)
+        wall = time.monotonic() - wall_started
+        sampling.set()
+
+        children_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+        self_after = process.cpu_times()
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/stats") as response:
+            stats = json.load(response)
+
+        ffmpeg_cpu = (children_after.ru_utime - children_before.ru_utime) + (
+            children_after.ru_stime - children_before.ru_stime
+        )
+        recorder_cpu = (self_after.user - self_before.user) + (
+            self_after.system - self_before.system
+        )
+        start_lags = [
+            stats[name]["connected_at"] - requested[name]
+            for name in requested
+            if name in stats
+        ]
+        recorded = [path for path in finished if path]
+        chapters = [
+            len(recorder.catalog.get(os.path.basename(path))["chapters"])
+            for path in recorded
+        ]
+        # The server sends a new title every ``title_every`` seconds; allow
+        # for the last one arriving too late to make it into the recording
+        min_chapters = max(1, args.duration // args.title_every - 1)
+        return {
+            "streams": {
+                "stations": args.stations,
+                "duration_s": args.duration,
+                "bitrate_kbps": args.bitrate,
+                "wall_s": round(wall, 2),
+                "completed": len(finished),
+                "recorded": len(recorded),
+                "never_connected": args.stations - len(start_lags),
+                "start_lag": summarize_ms(start_lags),
+                "ffmpeg_cpu_s": round(ffmpeg_cpu, 2),
+                "cpu_per_stream_pct": round(
+                    100 * ffmpeg_cpu / args.stations / args.duration, 3
+                ),
+                "recorder_cpu_s": round(recorder_cpu, 2),
+                "peak_ffmpeg_processes": peaks["children"],
+                "peak_ffmpeg_rss_mb": round(peaks["children_rss"] / 2**20, 1),
+                "peak_rss_per_stream_mb": round(
+                    peaks["children_rss"] / 2**20 / max(peaks["children"], 1), 2
+                ),
+                "peak_recorder_rss_mb": round(peaks["recorder_rss"] / 2**20, 1),
+                "largest_child_rss_mb": round(children_after.ru_maxrss / 1024, 1),
+                "bytes_sent": sum(s["sent"] for s in stats.values()),
+                "bytes_dropped": sum(s["dropped"] for s in stats.values()),
+                "bytes_recorded": sum(os.path.getsize(path) for path in recorded),
+                "reconnects": sum(s["connections"] - 1 for s in stats.values()),
+                "title_every_s": args.title_every,
+                "chapters_per_recording": {
+                    "min": min(chapters, default=0),
+                    "median": statistics.median(chapters) if chapters else 0,
+                    "max": max(chapters, default=0),
+                },
+                "short_on_chapters": sum(1 for n in chapters if n < min_chapters),
+            }
+        }
+    finally:
+        server.terminate()
+        server.wait()
+        if not args.keep:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workdir", help="where to create scratch directories")
+    parser.add_argument("--keep", action="store_true", help="keep scratch directories")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    catalog = commands.add_parser("catalog", help="time web catalog paths")
+    catalog.add_argument("--sizes", default="1000,10000,100000")
+    catalog.add_argument("--edits", type=int, default=20)
+
+    catalog_size = commands.add_parser("catalog-size")
+    catalog_size.add_argument("--config", required=True)
+    catalog_size.add_argument("--edits", type=int, default=20)
+
+    streams = commands.add_parser("streams", help="record many simulated stations")
+    streams.add_argument("--stations", type=int, default=200)
+    streams.add_argument("--duration", type=int, default=30)
+    streams.add_argument("--bitrate", type=int, default=128)
+    streams.add_argument(
+        "--title-every", type=int, default=10, help="seconds between track titles"
+    )
+    streams.add_argument(
+        "--timeout", type=int, default=60, help="extra seconds to wait for ffmpeg"
+    )
+
+    serve_parser = commands.add_parser("serve", help="run the stand-in stream server")
+    serve_parser.add_argument("--port", type=int, default=8000)
+    serve_parser.add_argument("--bitrate", type=int, default=128)
+    serve_parser.add_argument("--title-every", type=int, default=10)
+
+    args = parser.parse_args()
+    if args.command == "catalog-size":
+        bench_catalog_size(args)
+        return
+    if args.command == "serve":
+        asyncio.run(
+            serve(args.port, bitrate=args.bitrate, title_every=args.title_every)
+        )
+        return
+
+    results = bench_catalog(args) if args.command == "catalog" else bench_streams(args)
+    results = {"python": sys.version.split()[0], "cpus": os.cpu_count(), **results}
+    json.dump(results, sys.stdout, indent=2)
+    print()
+    if results.get("streams", {}).get("short_on_chapters"):
+        sys.exit("Some recordings are missing track chapters")
+
+
+if __name__ == "__main__":
+    main()
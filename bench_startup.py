@@ -0,0 +1,150 @@
+"""Startup-time benchmark for the recorder and the web app.
+
+Each measurement runs in a fresh interpreter against a throwaway config, and
+reports import time, time to the first ready state (the recorder's
+``configure()`` plus its schedule, the web app's first request) and which
+heavy optional modules were loaded by the import alone. Results are printed
+as JSON:
+
+    python bench_startup.py --runs 10 > bench_output.txt
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+
+LAZY_MODULES = ["mutagen", "psutil", "humanize", "pydub"]
+
+RECORDER_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import recorder
+imported = time.perf_counter()
+loaded = [name for name in {lazy} if name in sys.modules]
+config = recorder.configure()
+recorder.get_next_7_days_schedule(config)
+ready = time.perf_counter()
+print(json.dumps({{"import": imported - started, "first_ready": ready - imported,
+                  "lazy_loaded_on_import": loaded}}))
+"""
+
+APP_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+loaded = [name for name in {lazy} if name in sys.modules]
+client = app.app.test_client()
+response = client.get({path!r})
+ready = time.perf_counter()
+assert response.status_code == 200, response.status_code
+print(json.dumps({{"import": imported - started, "first_ready": ready - imported,
+                  "lazy_loaded_on_import": loaded}}))
+"""
+
+TEST_PROBE = """
+import json, os, time
+before = set(os.listdir("."))
+started = time.perf_counter()
+import test
+imported = time.perf_counter()
+print(json.dumps({"import": imported - started,
+                  "created_files": sorted(set(os.listdir(".")) - before)}))
+"""
+
+
+def write_config(directory):
+    config = {
+        "base_dir": directory,
+        "output_dir": os.path.join(directory, "recordings"),
+        "log_file": os.path.join(directory, "recorder.log"),
+        "status_file": os.path.join(directory, "radiojoe_status.json"),
+        "catalog_file": os.path.join(directory, "radiojoe_catalog.db"),
+        "shows": [
+            {
+                "name": f"Show {i}",
+                "url": "http://127.0.0.1:9/stream",
+                "day": day,
+                "time": "08:00 PM",
+                "timezone": "America/Chicago",
+                "duration": 3600,
+            }
+            for i, day in enumerate(["Monday", "Wednesday", "Friday"])
+        ],
+    }
+    os.makedirs(config["output_dir"], exist_ok=True)
+    path = os.path.join(directory, "config.json")
+    with open(path, "w") as f:
+        json.dump(config, f)
+    return path
+
+
+def run_probe(source, config_path, cwd):
+    env = dict(os.environ, RADIOJOE_CONFIG_FILE=config_path)
+    repo = os.path.dirname(os.path.abspath(__file__))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [repo, env.get("PYTHONPATH")]))
+    result = subprocess.run(
+        [sys.executable, "-c", source],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def summarize(samples, key):
+    values = [sample[key] for sample in samples]
+    return {
+        "median_ms": round(statistics.median(values) * 1000, 2),
+        "min_ms": round(min(values) * 1000, 2),
+        "max_ms": round(max(values) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--path", default="/status", help="web app path to time as the first request"
+    )
+    args = parser.parse_args()
+
+    probes = {
+        "recorder": RECORDER_PROBE.format(lazy=LAZY_MODULES),
+        "app": APP_PROBE.format(lazy=LAZY_MODULES, path=args.path),
+    }
+    results = {"python": sys.version.split()[0], "runs": args.runs}
+    with tempfile.TemporaryDirectory(prefix="radiojoe-bench-") as directory:
+        config_path = write_config(directory)
+        for name, source in probes.items():
+            # Each run gets a fresh catalog so the first one isn't special
+            samples = []
+            for _ in range(args.runs):
+                for leftover in os.listdir(directory):
+                    if leftover.startswith("radiojoe_catalog.db"):
+                        os.remove(os.path.join(directory, leftover))
+                samples.append(run_probe(source, config_path, directory))
+            results[name] = {
+                "import": summarize(samples, "import"),
+                "first_ready": summarize(samples, "first_ready"),
+                "lazy_loaded_on_import": samples[-1]["lazy_loaded_on_import"],
+            }
+        test_import = run_probe(TEST_PROBE, config_path, directory)
+        results["test"] = {
+            "import_ms": round(test_import["import"] * 1000, 2),
+            "created_files": test_import["created_files"],
+        }
+
+    json.dump(results, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
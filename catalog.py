@@ -0,0 +1,449 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from chapters import read_chapter_frames
+
+
+TAG_FIELDS = ["title", "artist", "album", "genre", "year", "comment"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS recordings (
+    filename TEXT PRIMARY KEY,
+    show TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    title TEXT NOT NULL DEFAULT '',
+    artist TEXT NOT NULL DEFAULT '',
+    album TEXT NOT NULL DEFAULT '',
+    genre TEXT NOT NULL DEFAULT '',
+    year TEXT NOT NULL DEFAULT '',
+    comment TEXT NOT NULL DEFAULT '',
+    duration REAL NOT NULL DEFAULT 0,
+    bitrate INTEGER NOT NULL DEFAULT 0,
+    -- Track chapters from in-stream metadata, as JSON, and their titles one
+    -- per line for the search index
+    chapters TEXT NOT NULL DEFAULT '[]',
+    tracks TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS recordings_mtime ON recordings (mtime_ns);
+CREATE INDEX IF NOT EXISTS recordings_show ON recordings (show);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS traces (
+    filename TEXT PRIMARY KEY,
+    show TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    start_lag REAL,
+    input_open_ms REAL,
+    exit_reason TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS traces_show ON traces (show, started_at);
+"""
+
+# Full-text index over the searchable fields, kept in sync by triggers
+SEARCH_COLUMNS = [
+    "show",
+    "title",
+    "artist",
+    "album",
+    "genre",
+    "comment",
+    "date",
+    "tracks",
+]
+SEARCH_WEIGHTS = [10.0, 10.0, 5.0, 5.0, 2.0, 1.0, 2.0, 3.0]
+SEARCH_VALUES = (
+    "{row}.show, {row}.title, {row}.artist, {row}.album, {row}.genre, "
+    "{row}.comment, "
+    "strftime('%Y-%m-%d', {row}.mtime_ns / 1000000000, 'unixepoch', 'localtime'), "
+    "{row}.tracks"
+)
+DROP_SEARCH_SCHEMA = """
+DROP TRIGGER IF EXISTS recordings_fts_insert;
+DROP TRIGGER IF EXISTS recordings_fts_delete;
+DROP TRIGGER IF EXISTS recordings_fts_update;
+DROP TABLE IF EXISTS recordings_fts;
+"""
+SEARCH_SCHEMA = f"""
+CREATE VIRTUAL TABLE recordings_fts USING fts5(
+    {", ".join(SEARCH_COLUMNS)}, tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER recordings_fts_insert AFTER INSERT ON recordings BEGIN
+    INSERT INTO recordings_fts (rowid, {", ".join(SEARCH_COLUMNS)})
+    VALUES (new.rowid, {SEARCH_VALUES.format(row="new")});
+END;
+CREATE TRIGGER recordings_fts_delete AFTER DELETE ON recordings BEGIN
+    DELETE FROM recordings_fts WHERE rowid = old.rowid;
+END;
+CREATE TRIGGER recordings_fts_update AFTER UPDATE ON recordings BEGIN
+    DELETE FROM recordings_fts WHERE rowid = old.rowid;
+    INSERT INTO recordings_fts (rowid, {", ".join(SEARCH_COLUMNS)})
+    VALUES (new.rowid, {SEARCH_VALUES.format(row="new")});
+END;
+INSERT INTO recordings_fts (rowid, {", ".join(SEARCH_COLUMNS)})
+SELECT rowid, {SEARCH_VALUES.format(row="recordings")} FROM recordings;
+"""
+
+
+def get_mp3_tags(file_path):
+    # mutagen is imported on first use to keep startup fast
+    from mutagen.mp3 import MP3
+    from mutagen.id3 import ID3
+
+    return mp3_tags(MP3(file_path, ID3=ID3))
+
+
+def mp3_tags(audio):
+    tags = {}
+    if audio.tags:
+        tags["title"] = str(audio.tags.get("TIT2", [""])[0])
+        tags["artist"] = str(audio.tags.get("TPE1", [""])[0])
+        tags["album"] = str(audio.tags.get("TALB", [""])[0])
+        tags["genre"] = str(audio.tags.get("TCON", [""])[0])
+        # mutagen saves ID3v2.4, which stores the year as TDRC
+        year = audio.tags.get("TYER") or audio.tags.get("TDRC")
+        tags["year"] = str(year[0]) if year else ""
+        # Prefer the comment we write (see retag.write_tags) over others,
+        # such as an encoder's
+        comments = audio.tags.getall("COMM")
+        ours = [frame for frame in comments if frame.desc == "comment"]
+        comments = ours or comments
+        tags["comment"] = str(comments[0]) if comments else ""
+    return tags
+
+
+def fts_query(text):
+    """Turn free text into an FTS5 query; the last word matches as a prefix."""
+    terms = [term.replace('"', '""') for term in text.split()]
+    if not terms:
+        return ""
+    return " ".join(f'"{term}"' for term in terms) + "*"
+
+
+def matching_chapters(chapters, text):
+    """Chapters whose title contains every word of ``text``, ignoring case."""
+    terms = text.lower().split()
+    return [
+        chapter
+        for chapter in chapters
+        if terms and all(term in chapter["title"].lower() for term in terms)
+    ]
+
+
+def show_name_from_filename(filename):
+    # Recordings are saved as "<show name>_<YYYYMMDD>_<HHMMSS>.mp3"
+    stem = os.path.splitext(filename)[0]
+    parts = stem.rsplit("_", 2)
+    if len(parts) == 3 and parts[1].isdigit() and parts[2].isdigit():
+        return parts[0]
+    return stem
+
+
+class Catalog:
+    """Index of the recordings directory kept in SQLite.
+
+    Tags are read once per file and re-read only when the file's size or
+    mtime changes. Every change bumps a version counter that callers can use
+    as a cache key. The database is shared by the web app and the recorder,
+    in WAL mode, so they must run on the host that holds the file.
+    """
+
+    def __init__(self, db_path, recordings_dir, refresh_interval=10):
+        self.db_path = db_path
+        self.recordings_dir = recordings_dir
+        self.refresh_interval = refresh_interval
+        self._local = threading.local()
+        self._refresh_lock = threading.Lock()
+        self._last_refresh = 0
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            self._migrate(conn)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _migrate(self, conn):
+        # Create the search index, or rebuild it when its columns changed
+        search_columns = [
+            row["name"] for row in conn.execute("PRAGMA table_info(recordings_fts)")
+        ]
+        if search_columns != SEARCH_COLUMNS:
+            conn.executescript(DROP_SEARCH_SCHEMA + SEARCH_SCHEMA)
+
+    def _bump_version(self, conn):
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('version', 1) "
+            "ON CONFLICT(key) DO UPDATE SET value = value + 1"
+        )
+
+    def _read_entry(self, filename, stat):
+        from mutagen.mp3 import MP3
+        from mutagen.id3 import ID3
+
+        file_path = os.path.join(self.recordings_dir, filename)
+        try:
+            audio = MP3(file_path, ID3=ID3)
+            tags = mp3_tags(audio)
+            duration, bitrate = audio.info.length, audio.info.bitrate
+            chapters = read_chapter_frames(audio.tags) if audio.tags else []
+        except Exception:
+            tags, duration, bitrate, chapters = {}, 0, 0, []
+        entry = {
+            "filename": filename,
+            "show": show_name_from_filename(filename),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "duration": duration,
+            "bitrate": bitrate,
+            "chapters": json.dumps(chapters),
+            "tracks": "\n".join(chapter["title"] for chapter in chapters),
+        }
+        for field in TAG_FIELDS:
+            entry[field] = tags.get(field, "")
+        return entry
+
+    def _upsert(self, conn, entry):
+        # An upsert rather than INSERT OR REPLACE, so the update trigger
+        # keeps the search index in step
+        columns = list(entry)
+        updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c != "filename")
+        conn.execute(
+            f"INSERT INTO recordings ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)}) "
+            f"ON CONFLICT(filename) DO UPDATE SET {updates}",
+            [entry[c] for c in columns],
+        )
+
+    def refresh(self, force=False):
+        """Reconcile the catalog with the recordings directory.
+
+        Only stats files; tags are read for new or modified files. Runs at
+        most once per ``refresh_interval`` seconds unless ``force`` is set.
+        """
+        with self._refresh_lock:
+            since_last = time.monotonic() - self._last_refresh
+            if not force and since_last < self.refresh_interval:
+                return
+            self._last_refresh = time.monotonic()
+
+            on_disk = {}
+            if os.path.isdir(self.recordings_dir):
+                with os.scandir(self.recordings_dir) as entries:
+                    for entry in entries:
+                        if entry.name.endswith(".mp3") and entry.is_file():
+                            on_disk[entry.name] = entry.stat()
+
+            conn = self._connect()
+            known = {
+                row["filename"]: (row["size"], row["mtime_ns"])
+                for row in conn.execute(
+                    "SELECT filename, size, mtime_ns FROM recordings"
+                )
+            }
+
+            changed = [
+                self._read_entry(name, stat)
+                for name, stat in on_disk.items()
+                if known.get(name) != (stat.st_size, stat.st_mtime_ns)
+            ]
+            removed = [name for name in known if name not in on_disk]
+
+            if changed or removed:
+                with conn:
+                    for entry in changed:
+                        self._upsert(conn, entry)
+                    conn.executemany(
+                        "DELETE FROM recordings WHERE filename = ?",
+                        [(name,) for name in removed],
+                    )
+                    conn.executemany(
+                        "DELETE FROM traces WHERE filename = ?",
+                        [(name,) for name in removed],
+                    )
+                    self._bump_version(conn)
+
+    def update(self, filename):
+        """Re-read a single recording after it was written or retagged."""
+        file_path = os.path.join(self.recordings_dir, filename)
+        conn = self._connect()
+        if not os.path.exists(file_path):
+            self.remove(filename)
+            return
+        entry = self._read_entry(filename, os.stat(file_path))
+        with conn:
+            self._upsert(conn, entry)
+            self._bump_version(conn)
+
+    def remove(self, filename):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM recordings WHERE filename = ?", (filename,))
+            conn.execute("DELETE FROM traces WHERE filename = ?", (filename,))
+            self._bump_version(conn)
+
+    def version(self):
+        """Current catalog version, after picking up any changes on disk."""
+        self.refresh()
+        row = self._connect().execute(
+            "SELECT value FROM meta WHERE key = 'version'"
+        ).fetchone()
+        return row["value"] if row else 0
+
+    def _to_recording(self, row):
+        return {
+            "filename": row["filename"],
+            "show": row["show"],
+            "size": row["size"],
+            "date": datetime.fromtimestamp(row["mtime_ns"] / 1e9).strftime(
+                "%Y-%m-%d %H:%M:%S"
+            ),
+            "mtime": row["mtime_ns"] / 1e9,
+            "duration": row["duration"],
+            "bitrate": row["bitrate"],
+            "chapters": json.loads(row["chapters"]),
+            "tags": {field: row[field] for field in TAG_FIELDS},
+        }
+
+    def list_recordings(self, refresh=True):
+        """All recordings, newest first."""
+        if refresh:
+            self.refresh()
+        rows = self._connect().execute(
+            "SELECT * FROM recordings ORDER BY mtime_ns DESC"
+        )
+        return [self._to_recording(row) for row in rows]
+
+    def get(self, filename):
+        row = (
+            self._connect()
+            .execute("SELECT * FROM recordings WHERE filename = ?", (filename,))
+            .fetchone()
+        )
+        return self._to_recording(row) if row else None
+
+    def search(self, text, limit=50, offset=0):
+        """Ranked full-text search. Returns ``(recordings, total_matches)``."""
+        query = fts_query(text)
+        if not query:
+            return [], 0
+        self.refresh()
+        conn = self._connect()
+        weights = ", ".join(str(w) for w in SEARCH_WEIGHTS)
+        rows = conn.execute(
+            f"SELECT recordings.* FROM recordings_fts "
+            f"JOIN recordings ON recordings.rowid = recordings_fts.rowid "
+            f"WHERE recordings_fts MATCH ? "
+            f"ORDER BY bm25(recordings_fts, {weights}), recordings.mtime_ns DESC "
+            f"LIMIT ? OFFSET ?",
+            (query, limit, offset),
+        ).fetchall()
+        total = conn.execute(
+            "SELECT COUNT(*) FROM recordings_fts WHERE recordings_fts MATCH ?",
+            (query,),
+        ).fetchone()[0]
+        results = []
+        for row in rows:
+            recording = self._to_recording(row)
+            # Tracks that matched, so the UI can jump straight to them
+            recording["track_matches"] = matching_chapters(
+                recording["chapters"], text
+            )
+            results.append(recording)
+        return results, total
+
+    def show_recordings(self, show):
+        """A show's recordings, newest first."""
+        self.refresh()
+        rows = self._connect().execute(
+            "SELECT * FROM recordings WHERE show = ? ORDER BY mtime_ns DESC", (show,)
+        )
+        return [self._to_recording(row) for row in rows]
+
+    def show_signature(self, show):
+        """Cheap fingerprint that changes whenever one of a show's recordings does.
+
+        The first item is the number of recordings.
+        """
+        self.refresh()
+        row = (
+            self._connect()
+            .execute(
+                "SELECT COUNT(*), TOTAL(size), TOTAL(mtime_ns), MAX(mtime_ns) "
+                "FROM recordings WHERE show = ?",
+                (show,),
+            )
+            .fetchone()
+        )
+        return tuple(row)
+
+    def count(self):
+        self.refresh()
+        return self._connect().execute("SELECT COUNT(*) FROM recordings").fetchone()[0]
+
+    def latest(self):
+        self.refresh()
+        row = (
+            self._connect()
+            .execute("SELECT * FROM recordings ORDER BY mtime_ns DESC LIMIT 1")
+            .fetchone()
+        )
+        return self._to_recording(row) if row else None
+
+    def save_trace(self, filename, trace):
+        """Store a capture's trace record (see ``traces.RecordingTrace``)."""
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT INTO traces (filename, show, started_at, start_lag, "
+                "input_open_ms, exit_reason, data) VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(filename) DO UPDATE SET show = excluded.show, "
+                "started_at = excluded.started_at, start_lag = excluded.start_lag, "
+                "input_open_ms = excluded.input_open_ms, "
+                "exit_reason = excluded.exit_reason, data = excluded.data",
+                (
+                    filename,
+                    trace["show"],
+                    trace["started_at"],
+                    trace["start_lag"],
+                    trace["input_open_ms"],
+                    trace["exit_reason"],
+                    json.dumps(trace),
+                ),
+            )
+
+    def get_trace(self, filename):
+        row = (
+            self._connect()
+            .execute("SELECT data FROM traces WHERE filename = ?", (filename,))
+            .fetchone()
+        )
+        return json.loads(row["data"]) if row else None
+
+    def trace_summary(self, since=None):
+        """Start lag, input open time and failures per show and hour of day.
+
+        ``since`` is a Unix timestamp; by default all stored traces count.
+        """
+        rows = self._connect().execute(
+            "SELECT show, "
+            "CAST(strftime('%H', started_at, 'unixepoch', 'localtime') AS INTEGER) "
+            "AS hour, COUNT(*) AS recordings, AVG(start_lag) AS avg_start_lag, "
+            "MAX(start_lag) AS max_start_lag, AVG(input_open_ms) AS avg_input_open_ms, "
+            "SUM(exit_reason != 'completed') AS not_completed "
+            "FROM traces WHERE started_at >= ? GROUP BY show, hour "
+            "ORDER BY avg_start_lag DESC",
+            (since or 0,),
+        )
+        return [dict(row) for row in rows]
@@ -0,0 +1,234 @@
+import json
+import logging
+import os
+import re
+import time
+from collections import deque
+
+
+# With "-loglevel level+verbose" ffmpeg prefixes each line with the
+# component that logged it (if any) and its level:
+# "[http @ 0x...] [verbose] message" or "[info] message"
+LOG_LINE = re.compile(r"^((?:\[[^\]]+ @ [^\]]+\] )*)\[([a-z]+)\] (.*)$")
+LOG_CONTEXT = re.compile(r"\[([^\]\s]+) @ ")
+# Components that log while connecting, before any of the stream is read
+NETWORK_CONTEXTS = {"tcp", "tls", "http", "https", "AVFormatContext"}
+# ICY metadata arriving on the capture connection is only logged at verbose
+# level: "[http @ 0x...] [verbose] Metadata update for StreamTitle: Song"
+STREAM_TITLE = re.compile(r"^Metadata update for StreamTitle: ?(.*)$")
+# The title playing when we connected only shows up in the input's metadata
+# dump: "[info]     StreamTitle     : Song"
+INPUT_TITLE = re.compile(r"^\s+StreamTitle\s*: ?(.*)$")
+PROGRESS_TIME = re.compile(r"time=(\d+):(\d+):(\d+(?:\.\d+)?)")
+# Output written so far, "size=     126KiB" (older ffmpeg: "126kB")
+PROGRESS_SIZE = re.compile(r"size=\s*(\d+)([kKmMgG]?)i?B")
+SIZE_UNITS = {"": 1, "k": 2**10, "m": 2**20, "g": 2**30}
+PROBLEM_LEVELS = {
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+    "fatal": logging.ERROR,
+    "panic": logging.ERROR,
+}
+
+
+class ChapterCollector:
+    """Reads ffmpeg's stderr while it records, collecting timed track titles.
+
+    ffmpeg must run with ``-loglevel level+verbose``: track changes are
+    only logged at verbose level. Titles seen before ffmpeg starts writing
+    its output (including the one in the input's metadata) start at 0.
+    After that, positions come from ffmpeg's own progress output
+    (``time=``), so they match the recorded audio; wall-clock time since the
+    output opened is used until the first progress line. The last
+    ``tail_lines`` non-progress, non-verbose lines are kept for error
+    reporting. ``opened_at`` is the monotonic time ffmpeg reported its
+    input open (connected, and read enough to identify the format), and
+    ``output_bytes`` the size of the recording from its latest progress
+    line. Warnings and errors are passed to ``limiter`` (a
+    ``logs.RepeatLimiter``) when one is given.
+
+    ``events`` holds the monotonic times at which ffmpeg's first line of
+    output (``started``), first connection attempt (``connecting``, after
+    any DNS lookup), first successful connection (``connected``) and first
+    line from the demuxer after that (``first_data``) were read.
+    ``network_error`` is ffmpeg's first connection error, if any.
+    """
+
+    def __init__(self, tail_lines=50, limiter=None):
+        self.chapters = []
+        self.tail = deque(maxlen=tail_lines)
+        self.opened_at = None
+        self.events = {}
+        self.network_error = None
+        self.output_bytes = 0
+        self.limiter = limiter
+        self.last_error = None
+        self._position = None
+        self._output_started = None
+        self._in_input_dump = False
+
+    def position(self):
+        if self._position is not None:
+            return self._position
+        if self._output_started is None:
+            return 0.0
+        return time.monotonic() - self._output_started
+
+    def feed_line(self, line):
+        progress = PROGRESS_TIME.search(line)
+        if progress:
+            hours, minutes, seconds = progress.groups()
+            self._position = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+            size = PROGRESS_SIZE.search(line)
+            if size:
+                self.output_bytes = int(size.group(1)) * SIZE_UNITS[
+                    size.group(2).lower()
+                ]
+            return
+        parsed = LOG_LINE.match(line)
+        prefix, level, message = parsed.groups() if parsed else ("", None, line)
+        self._note_timing(set(LOG_CONTEXT.findall(prefix)), level, message)
+
+        title = STREAM_TITLE.match(message)
+        if title:
+            self._add_chapter(title.group(1))
+        if level in ("verbose", "debug", "trace") and not title:
+            return
+        self.tail.append(line)
+
+        if message.startswith("Input #0,"):
+            self._in_input_dump = True
+            if self.opened_at is None:
+                self.opened_at = time.monotonic()
+        elif message.startswith(("Stream mapping:", "Output #0,")):
+            self._in_input_dump = False
+            if self._output_started is None:
+                self._output_started = time.monotonic()
+        elif self._in_input_dump:
+            title = INPUT_TITLE.match(message)
+            if title:
+                self._add_chapter(title.group(1))
+
+        if level in PROBLEM_LEVELS:
+            if PROBLEM_LEVELS[level] >= logging.ERROR:
+                self.last_error = line
+            if self.limiter is not None:
+                self.limiter.log(PROBLEM_LEVELS[level], f"ffmpeg: {line}")
+
+    def _note_timing(self, contexts, level, message):
+        now = time.monotonic()
+        events = self.events
+        events.setdefault("started", now)
+        if "tcp" in contexts:
+            if message.startswith("Starting connection attempt"):
+                events.setdefault("connecting", now)
+            elif message.startswith("Successfully connected"):
+                events.setdefault("connected", now)
+            elif level in ("error", "fatal") and self.network_error is None:
+                self.network_error = message
+        elif "connected" in events and "first_data" not in events:
+            if (contexts - NETWORK_CONTEXTS) or message.startswith("Input #0,"):
+                events["first_data"] = now
+
+    def _add_chapter(self, title):
+        title = title.strip()
+        if title and (not self.chapters or self.chapters[-1][1] != title):
+            self.chapters.append((round(self.position(), 3), title))
+
+    def consume(self, stream):
+        """Read ``stream`` (ffmpeg's stderr) to EOF, line by line.
+
+        ffmpeg ends progress lines with a carriage return, so both
+        ``\\r`` and ``\\n`` end a line.
+        """
+        read = getattr(stream, "read1", stream.read)
+        buffer = b""
+        while True:
+            data = read(4096)
+            if not data:
+                break
+            buffer += data
+            lines = re.split(rb"[\r\n]", buffer)
+            buffer = lines.pop()
+            for line in lines:
+                if line:
+                    self.feed_line(line.decode(errors="replace"))
+        if buffer:
+            self.feed_line(buffer.decode(errors="replace"))
+
+    def stderr_tail(self):
+        return "\n".join(self.tail)
+
+    def failure_reason(self):
+        """ffmpeg's last error line, or its last line of output."""
+        return self.last_error or (self.tail[-1] if self.tail else "no output")
+
+    def finalize(self, duration):
+        """Chapters as dicts with ``start``, ``end`` (seconds) and ``title``."""
+        result = []
+        starts = [start for start, _ in self.chapters[1:]] + [duration]
+        for (start, title), end in zip(self.chapters, starts):
+            if start >= duration:
+                break
+            result.append({"start": start, "end": min(end, duration), "title": title})
+        return result
+
+
+def add_chapter_frames(tags, chapters):
+    """Add ID3 CHAP frames and a CTOC table of contents for ``chapters``."""
+    from mutagen.id3._frames import CHAP, CTOC, TIT2
+    from mutagen.id3._specs import CTOCFlags
+
+    tags.delall("CHAP")
+    tags.delall("CTOC")
+    if not chapters:
+        return
+    element_ids = [f"chp{index}" for index in range(len(chapters))]
+    tags.add(
+        CTOC(
+            element_id="toc",
+            flags=CTOCFlags.TOP_LEVEL | CTOCFlags.ORDERED,
+            child_element_ids=element_ids,
+            sub_frames=[TIT2(encoding=3, text="Tracks")],
+        )
+    )
+    for element_id, chapter in zip(element_ids, chapters):
+        tags.add(
+            CHAP(
+                element_id=element_id,
+                start_time=int(chapter["start"] * 1000),
+                end_time=int(chapter["end"] * 1000),
+                sub_frames=[TIT2(encoding=3, text=chapter["title"])],
+            )
+        )
+
+
+def read_chapter_frames(tags):
+    """Chapters stored in ID3 CHAP frames, in order."""
+    chapters = []
+    for frame in tags.getall("CHAP"):
+        titles = frame.sub_frames.getall("TIT2")
+        chapters.append(
+            {
+                "start": frame.start_time / 1000,
+                "end": frame.end_time / 1000,
+                "title": str(titles[0]) if titles else "",
+            }
+        )
+    return sorted(chapters, key=lambda chapter: chapter["start"])
+
+
+def sidecar_path(output_file):
+    return f"{output_file}.chapters.json"
+
+
+def write_sidecar(output_file, chapters):
+    with open(sidecar_path(output_file), "w") as f:
+        json.dump({"chapters": chapters}, f, indent=2)
+
+
+def delete_sidecar(output_file):
+    try:
+        os.remove(sidecar_path(output_file))
+    except FileNotFoundError:
+        pass
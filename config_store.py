@@ -0,0 +1,141 @@
+import copy
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+
+
+class StaleConfigError(Exception):
+    """Raised when saving a config that was edited from an outdated version."""
+
+
+class ConfigError(Exception):
+    """Raised when the config file is missing or isn't valid JSON."""
+
+
+def show_id(show, position):
+    # Derived from the show's contents so that processes which assign IDs to
+    # the same legacy config concurrently agree on them.
+    digest = hashlib.sha1(
+        f"{position}:{json.dumps(show, sort_keys=True)}".encode("utf-8")
+    )
+    return digest.hexdigest()[:10]
+
+
+class ConfigStore:
+    """Cached, atomically written access to the JSON config file.
+
+    The parsed config is reused until the file's mtime or size changes.
+    ``version()`` is a hash of the file contents; passing it back to
+    ``save()`` rejects edits made against an older version.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._stat = None
+        self._config = None
+        self._version = None
+
+    def _reload_if_changed(self):
+        stat = os.stat(self.path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        if key == self._stat:
+            return
+        with open(self.path, "rb") as f:
+            raw = f.read()
+        config = json.loads(raw)
+        self._config = config
+        self._version = hashlib.sha1(raw).hexdigest()[:16]
+        self._stat = key
+        if self._assign_ids(config):
+            try:
+                self._write(config)
+            except OSError as e:
+                # A read-only config still works; the IDs are derived from
+                # each show, so they come out the same next time
+                logging.warning(f"Could not save show IDs to {self.path}: {e}")
+
+    def _assign_ids(self, config):
+        changed = False
+        ids = set()
+        for position, show in enumerate(config.get("shows", [])):
+            if not show.get("id") or show["id"] in ids:
+                show["id"] = show_id(show, position)
+                changed = True
+            ids.add(show["id"])
+        return changed
+
+    def _write(self, config):
+        raw = json.dumps(config, indent=2).encode("utf-8")
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(
+            dir=directory, prefix=".config-", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(raw)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        stat = os.stat(self.path)
+        self._config = config
+        self._version = hashlib.sha1(raw).hexdigest()[:16]
+        self._stat = (stat.st_mtime_ns, stat.st_size)
+
+    def _refresh(self):
+        try:
+            self._reload_if_changed()
+        except FileNotFoundError:
+            raise ConfigError(f"Configuration file not found at {self.path}") from None
+        except json.JSONDecodeError as e:
+            raise ConfigError(
+                f"Invalid JSON in configuration file at {self.path}: {e}"
+            ) from None
+
+    def load(self):
+        """Return a copy of the current config, re-reading it only if changed.
+
+        Raises ``ConfigError`` if the file is missing or isn't valid JSON.
+        """
+        with self._lock:
+            self._refresh()
+            return copy.deepcopy(self._config)
+
+    def snapshot(self):
+        """Return ``(config, version)`` read consistently under the lock."""
+        with self._lock:
+            self._refresh()
+            return copy.deepcopy(self._config), self._version
+
+    def version(self):
+        with self._lock:
+            self._refresh()
+            return self._version
+
+    def save(self, config, expected_version=None):
+        """Atomically replace the config file.
+
+        If ``expected_version`` is given and the file has changed since that
+        version was read, raise ``StaleConfigError`` instead of overwriting.
+        Returns the new version.
+        """
+        with self._lock:
+            try:
+                self._reload_if_changed()
+            except FileNotFoundError:
+                pass
+            if expected_version is not None and expected_version != self._version:
+                raise StaleConfigError(
+                    "The configuration was changed by someone else"
+                )
+            config = copy.deepcopy(config)
+            self._assign_ids(config)
+            self._write(config)
+            return self._version
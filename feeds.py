@@ -0,0 +1,79 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from xml.sax.saxutils import escape, quoteattr
+
+
+ITUNES_NS = "http://www.itunes.com/dtds/podcast-1.0.dtd"
+ATOM_NS = "http://www.w3.org/2005/Atom"
+
+
+def _element(name, text, indent="    "):
+    return f"{indent}<{name}>{escape(str(text))}</{name}>"
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def build_feed(show_name, recordings, show, feed_url, link, enclosure_url):
+    """Render a podcast RSS 2.0 feed for one show.
+
+    ``recordings`` are catalog entries, newest first. ``show`` is the show's
+    config (may be empty for shows no longer scheduled). ``enclosure_url``
+    maps a filename to its absolute download URL.
+    """
+    artist = show.get("artist", "")
+    if not artist and recordings:
+        artist = recordings[0]["tags"]["artist"]
+    album = show.get("album") or show_name
+    updated = (
+        datetime.fromtimestamp(recordings[0]["mtime"], timezone.utc)
+        if recordings
+        else datetime.now(timezone.utc)
+    )
+
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        f'<rss version="2.0" xmlns:itunes="{ITUNES_NS}" xmlns:atom="{ATOM_NS}">',
+        "  <channel>",
+        _element("title", album),
+        _element("link", link),
+        _element("description", f"Recordings of {show_name}, captured by Radiojoe"),
+        _element("lastBuildDate", format_datetime(updated)),
+        f'    <atom:link href={quoteattr(feed_url)} rel="self" '
+        'type="application/rss+xml"/>',
+        _element("itunes:author", artist),
+        _element("itunes:summary", f"Recordings of {show_name}"),
+    ]
+    if show.get("genre"):
+        lines.append(f"    <itunes:category text={quoteattr(show['genre'])}/>")
+
+    for recording in recordings:
+        tags = recording["tags"]
+        published = datetime.fromtimestamp(recording["mtime"], timezone.utc)
+        description = " - ".join(
+            value for value in (tags["album"], tags["comment"]) if value
+        )
+        lines += [
+            "    <item>",
+            _element("title", tags["title"] or recording["filename"], "      "),
+            f'      <guid isPermaLink="false">{escape(recording["filename"])}</guid>',
+            _element("pubDate", format_datetime(published), "      "),
+            f"      <enclosure url={quoteattr(enclosure_url(recording['filename']))} "
+            f'length="{recording["size"]}" type="audio/mpeg"/>',
+        ]
+        if tags["artist"]:
+            lines.append(_element("itunes:author", tags["artist"], "      "))
+        if description:
+            lines.append(_element("description", description, "      "))
+        if recording["duration"]:
+            lines.append(
+                _element(
+                    "itunes:duration", format_duration(recording["duration"]), "      "
+                )
+            )
+        lines.append("    </item>")
+
+    lines += ["  </channel>", "</rss>", ""]
+    return "\n".join(lines)
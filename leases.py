@@ -0,0 +1,186 @@
+import json
+import sqlite3
+import threading
+import time
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    occurrence TEXT PRIMARY KEY,
+    job_json TEXT NOT NULL,
+    node TEXT NOT NULL,
+    status TEXT NOT NULL,
+    starts_at REAL NOT NULL,
+    ends_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 1,
+    output_file TEXT,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS leases_expiry ON leases (status, expires_at);
+CREATE TABLE IF NOT EXISTS nodes (
+    node TEXT PRIMARY KEY,
+    heartbeat_at REAL NOT NULL,
+    active INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+# A recording is not handed to another node more often than this
+MAX_ATTEMPTS = 3
+
+
+class LeaseStore:
+    """Expiring claims on show occurrences, shared by recorder nodes.
+
+    Every node schedules every show; whichever node claims an occurrence
+    first records it. The owner renews its lease while ffmpeg runs. If a
+    node dies its leases expire and another node takes over the rest of
+    the show. All writes happen inside ``BEGIN IMMEDIATE`` transactions so
+    claims are atomic across processes sharing the database file. The
+    database is in WAL mode, so those processes must be on one host: WAL
+    doesn't work over network filesystems.
+    """
+
+    def __init__(self, db_path, node, ttl=60):
+        self.db_path = db_path
+        self.node = node
+        self.ttl = ttl
+        self._local = threading.local()
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self, work):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = work(conn)
+            conn.execute("COMMIT")
+            return result
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def claim(self, occurrence, job, starts_at, ends_at):
+        """Try to take ``occurrence``. Returns True if this node now owns it."""
+        now = time.time()
+
+        def work(conn):
+            row = conn.execute(
+                "SELECT node, status, expires_at, attempts FROM leases "
+                "WHERE occurrence = ?",
+                (occurrence,),
+            ).fetchone()
+            if row is None:
+                conn.execute(
+                    "INSERT INTO leases (occurrence, job_json, node, status, "
+                    "starts_at, ends_at, expires_at) "
+                    "VALUES (?, ?, ?, 'recording', ?, ?, ?)",
+                    (
+                        occurrence,
+                        json.dumps(job),
+                        self.node,
+                        starts_at,
+                        ends_at,
+                        now + self.ttl,
+                    ),
+                )
+                return True
+            if row["status"] == "done":
+                return False
+            if row["node"] == self.node and row["status"] == "recording":
+                return True
+            if row["expires_at"] > now or row["attempts"] >= MAX_ATTEMPTS:
+                return False
+            conn.execute(
+                "UPDATE leases SET node = ?, status = 'recording', "
+                "expires_at = ?, attempts = attempts + 1 WHERE occurrence = ?",
+                (self.node, now + self.ttl, occurrence),
+            )
+            return True
+
+        return self._transaction(work)
+
+    def renew(self, occurrences, active=0):
+        """Extend this node's leases and record a heartbeat."""
+        now = time.time()
+
+        def work(conn):
+            conn.executemany(
+                "UPDATE leases SET expires_at = ? "
+                "WHERE occurrence = ? AND node = ? AND status = 'recording'",
+                [(now + self.ttl, occurrence, self.node) for occurrence in occurrences],
+            )
+            conn.execute(
+                "INSERT INTO nodes (node, heartbeat_at, active) VALUES (?, ?, ?) "
+                "ON CONFLICT(node) DO UPDATE SET "
+                "heartbeat_at = excluded.heartbeat_at, active = excluded.active",
+                (self.node, now, active),
+            )
+
+        self._transaction(work)
+
+    def complete(self, occurrence, output_file):
+        self._finish(occurrence, "done", output_file)
+
+    def fail(self, occurrence):
+        """Give the occurrence up so another node may retry what is left of it."""
+        self._finish(occurrence, "failed", None)
+
+    def _finish(self, occurrence, status, output_file):
+        now = time.time()
+
+        def work(conn):
+            conn.execute(
+                "UPDATE leases SET status = ?, output_file = ?, finished_at = ?, "
+                "expires_at = ? WHERE occurrence = ? AND node = ?",
+                (status, output_file, now, now, occurrence, self.node),
+            )
+
+        self._transaction(work)
+
+    def orphans(self, min_remaining=30, kind="recording"):
+        """Occurrences whose owner stopped renewing while the show is still on.
+
+        Only jobs of ``kind`` are returned (jobs without a ``kind`` count as
+        recordings), so e.g. a retention pass cut short isn't taken over.
+        """
+        now = time.time()
+        rows = self._connect().execute(
+            "SELECT * FROM leases WHERE status IN ('recording', 'failed') "
+            "AND expires_at < ? AND ends_at > ? AND attempts < ?",
+            (now, now + min_remaining, MAX_ATTEMPTS),
+        )
+        orphans = []
+        for row in rows:
+            job = json.loads(row["job_json"])
+            if job.get("kind", "recording") != kind:
+                continue
+            orphans.append(
+                {
+                    "occurrence": row["occurrence"],
+                    "job": job,
+                    "previous_node": row["node"],
+                    "starts_at": row["starts_at"],
+                    "ends_at": row["ends_at"],
+                }
+            )
+        return orphans
+
+    def nodes(self, max_age=None):
+        """Nodes that sent a heartbeat within ``max_age`` seconds (default 3 TTLs)."""
+        max_age = max_age if max_age is not None else self.ttl * 3
+        rows = self._connect().execute(
+            "SELECT node, heartbeat_at, active FROM nodes "
+            "WHERE heartbeat_at > ? ORDER BY node",
+            (time.time() - max_age,),
+        )
+        return [dict(row) for row in rows]
@@ -0,0 +1,123 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import re
+import threading
+import time
+from datetime import datetime, timezone
+
+
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+# Record attributes copied into JSON output when set
+CONTEXT_FIELDS = ["show", "show_id", "recording"]
+
+_context = threading.local()
+
+
+def set_log_context(**fields):
+    """Attach ``fields`` (e.g. show and recording IDs) to this thread's logs.
+
+    Meant for threads that do one job, such as a recording thread.
+    """
+    _context.fields = fields
+
+
+class ContextFilter(logging.Filter):
+    def __init__(self, process):
+        super().__init__()
+        self.process = process
+
+    def filter(self, record):
+        record.process_name = self.process
+        for key, value in getattr(_context, "fields", {}).items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "process": getattr(record, "process_name", None),
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class RepeatLimiter:
+    """Rate-limits repeated messages, e.g. ffmpeg warnings during a capture.
+
+    The first occurrence of a message is logged, repeats within ``interval``
+    seconds are counted, and the count is reported with the next occurrence
+    after the interval (or by ``flush``). Digits and hex addresses are
+    ignored when comparing messages.
+    """
+
+    def __init__(self, logger=None, interval=60):
+        self.logger = logger or logging.getLogger()
+        self.interval = interval
+        self._seen = {}
+
+    @staticmethod
+    def key(message):
+        return re.sub(r"0x[0-9a-f]+|\d+", "#", message)
+
+    def log(self, level, message):
+        key = self.key(message)
+        now = time.monotonic()
+        last_logged, suppressed, _ = self._seen.get(key, (None, 0, None))
+        if last_logged is not None and now - last_logged < self.interval:
+            self._seen[key] = (last_logged, suppressed + 1, (level, message))
+            return
+        if suppressed:
+            message = f"{message} (repeated {suppressed} more times)"
+        self.logger.log(level, message)
+        self._seen[key] = (now, 0, None)
+
+    def flush(self):
+        for _, suppressed, last in self._seen.values():
+            if suppressed:
+                level, message = last
+                self.logger.log(level, f"{message} (repeated {suppressed} more times)")
+        self._seen.clear()
+
+
+def setup_logging(
+    log_file, max_bytes=10 * 2**20, backup_count=5, log_format="json", process=None
+):
+    """Send the root logger through a queue to a size-rotated file.
+
+    Callers only put records on the queue; a background listener thread does
+    the formatting and file I/O, so logging never blocks a recording.
+    """
+    handler = logging.handlers.RotatingFileHandler(
+        log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+    )
+    handler.setFormatter(
+        JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT)
+    )
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter(process))
+
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    root.addHandler(queue_handler)
+
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -1,5 +1,6 @@
 import os
 import json
+import sys
 import schedule
 import time
 from datetime import datetime, timedelta
@@ -7,46 +8,125 @@ import pytz
 import subprocess
 import logging
 import threading
-from mutagen.mp3 import MP3
-from mutagen.id3 import ID3
-from mutagen.id3._frames import TPE1, TCON, TIT2, TALB
+import socket
+from config_store import ConfigError, ConfigStore
+from stream_probe import get_prober, pinned_url
+from catalog import Catalog
+from leases import LeaseStore
+from retention import RetentionWorker
+from chapters import ChapterCollector, add_chapter_frames, write_sidecar
+from traces import RecordingTrace
+from retag import make_frame
+from logs import RepeatLimiter, set_log_context, setup_logging
 
 
-# Load configuration
-def load_config():
-    config_path = os.getenv("RADIOJOE_CONFIG_FILE", "config.json")
-    try:
-        with open(config_path, "r") as f:
-            config = json.load(f)
-            return config
-    except FileNotFoundError:
-        print(f"Error: Configuration file not found at {config_path}. Exiting.")
-        exit(1)
-    except json.JSONDecodeError:
-        print(f"Error: Invalid JSON in configuration file at {config_path}. Exiting.")
-        exit(1)
-
+config_store = ConfigStore(os.getenv("RADIOJOE_CONFIG_FILE", "config.json"))
 
-config = load_config()
 
+# Load configuration; raises ConfigError if it is missing or invalid
+def load_config():
+    return config_store.load()
+
+
+# Set by configure() from the configuration file
+config = None
+BASE_DIR = None
+LOG_FILE = None
+OUTPUT_DIR = None
+STATUS_FILE = None
+CATALOG_FILE = None
+# Set to share recordings between several recorder processes or machines
+LEASE_FILE = None
+LEASE_TTL = 60
+NODE_NAME = None
+# 0 means no limit
+MAX_CONCURRENT_RECORDINGS = 0
+# Seconds a node waits per active recording before claiming a show
+CLAIM_STAGGER = 0.25
+# Minutes before a show starts to check its stream (0 disables the check)
+PREFLIGHT_MINUTES = 5
+PREFLIGHT_ATTEMPTS = 3
+PREFLIGHT_RETRY_DELAY = 30
+# Shows found on air at startup with less left than this aren't recorded
+RECOVERY_MIN_SECONDS = 30
 
-# Configuration parameters from config file
-BASE_DIR = config.get("base_dir", os.path.dirname(os.path.abspath(__file__)))
-LOG_FILE = config.get("log_file", os.path.join(BASE_DIR, "recorder.log"))
-OUTPUT_DIR = config.get("output_dir", os.path.join(BASE_DIR, "recordings"))
-CONFIG_FILE = config.get("config_file", "config.json")
-STATUS_FILE = config.get("status_file", "radiojoe_status.json")
 
+active_recordings = []
+# Occurrences (see occurrence_id) being recorded by this process
+active_occurrences = set()
+active_lock = threading.Lock()
+
+# Stream URLs and addresses resolved by the pre-flight check, keyed by show
+preflight_urls = {}
+
+catalog = None
+lease_store = None
+held_leases = set()
+held_leases_lock = threading.Lock()
+configure_lock = threading.Lock()
+
+
+def configure(process="recorder"):
+    """Load the configuration and set up logging, the catalog and leases.
+
+    Importing this module does no I/O; each entry point calls this once
+    before recording or serving. Later calls return the loaded config.
+    ``process`` names the caller in log records and, other than for the
+    recorder, in its log file name. Recorders sharing a lease file log to
+    a file named after their node.
+    """
+    global config, BASE_DIR, LOG_FILE, OUTPUT_DIR, STATUS_FILE, CATALOG_FILE
+    global LEASE_FILE, LEASE_TTL, NODE_NAME, MAX_CONCURRENT_RECORDINGS
+    global PREFLIGHT_MINUTES, PREFLIGHT_ATTEMPTS, catalog, lease_store
+
+    with configure_lock:
+        if config is not None:
+            return config
+        loaded = load_config()
 
-# Configure logging
-logging.basicConfig(
-    filename=LOG_FILE,
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-)
+        # Configuration parameters from config file
+        BASE_DIR = loaded.get(
+            "base_dir", os.path.dirname(os.path.abspath(__file__))
+        )
+        LOG_FILE = loaded.get("log_file", os.path.join(BASE_DIR, "recorder.log"))
+        OUTPUT_DIR = loaded.get("output_dir", os.path.join(BASE_DIR, "recordings"))
+        STATUS_FILE = loaded.get("status_file", "radiojoe_status.json")
+        CATALOG_FILE = loaded.get(
+            "catalog_file", os.path.join(BASE_DIR, "radiojoe_catalog.db")
+        )
+        LEASE_FILE = loaded.get("lease_file")
+        LEASE_TTL = loaded.get("lease_ttl", LEASE_TTL)
+        NODE_NAME = os.getenv(
+            "RADIOJOE_NODE",
+            loaded.get("node_name", f"{socket.gethostname()}-{os.getpid()}"),
+        )
+        MAX_CONCURRENT_RECORDINGS = loaded.get(
+            "max_concurrent_recordings", MAX_CONCURRENT_RECORDINGS
+        )
+        PREFLIGHT_MINUTES = loaded.get("preflight_minutes", PREFLIGHT_MINUTES)
+        PREFLIGHT_ATTEMPTS = loaded.get("preflight_attempts", PREFLIGHT_ATTEMPTS)
+
+        # Configure logging; each process gets its own file, as rotation
+        # isn't safe with several writers. Recorders sharing leases usually
+        # share storage too, so each node gets its own file as well
+        log_file = LOG_FILE
+        if process != "recorder":
+            log_file = f"{os.path.splitext(LOG_FILE)[0]}-{process}.log"
+        elif LEASE_FILE:
+            log_file = f"{os.path.splitext(LOG_FILE)[0]}-{NODE_NAME}.log"
+        setup_logging(
+            log_file,
+            max_bytes=loaded.get("log_max_bytes", 10 * 2**20),
+            backup_count=loaded.get("log_backup_count", 5),
+            log_format=loaded.get("log_format", "json"),
+            process=process,
+        )
 
-
-active_recordings = []
+        catalog = Catalog(CATALOG_FILE, OUTPUT_DIR)
+        if LEASE_FILE:
+            lease_store = LeaseStore(LEASE_FILE, NODE_NAME, LEASE_TTL)
+        config = loaded
+    return config
 
 
 def update_status(recordings):
@@ -60,10 +140,8 @@ def update_status(recordings):
         json.dump(status, f)
 
 
-def save_config(config):
-    config_path = os.getenv("RADIOJOE_CONFIG_FILE", "config.json")
-    with open(CONFIG_FILE, "w") as f:
-        json.dump(config, f, indent=2)
+def save_config(config, expected_version=None):
+    return config_store.save(config, expected_version)
 
 
 def get_next_7_days_schedule(config):
@@ -130,16 +208,54 @@ def convert_to_central(time_str, day, from_tz_str):
 
 
 # Function to record the stream
-def record_stream(name, url, duration, output_dir, metadata):
+def record_stream(
+    name,
+    url,
+    duration,
+    output_dir,
+    metadata,
+    on_finish=None,
+    scheduled_at=None,
+    partial=False,
+    show_id=None,
+    address=None,
+    occurrence=None,
+):
+    """Record ``url`` in a new thread.
+
+    The show is marked active before the thread starts. Returns False,
+    without recording, if ``occurrence`` is already being recorded.
+    """
+    with active_lock:
+        if occurrence is not None and occurrence in active_occurrences:
+            logging.info(f"{occurrence} is already being recorded")
+            return False
+        active_recordings.append(name)
+        if occurrence is not None:
+            active_occurrences.add(occurrence)
+    update_status(active_recordings)
+
     def _record():
+        recorded_file = None
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         output_file = os.path.join(output_dir, f"{name}_{timestamp}.mp3")
-
-        # FFmpeg command to capture the stream
-        command = [
-            "ffmpeg",
+        set_log_context(
+            show=name, show_id=show_id, recording=os.path.basename(output_file)
+        )
+        trace = RecordingTrace(name, url, duration, scheduled_at, partial)
+
+        # FFmpeg command to capture the stream; track changes (ICY
+        # StreamTitle updates) are only logged at verbose level
+        command = ["ffmpeg", "-loglevel", "level+verbose"]
+        capture_url, host_header = pinned_url(url, address)
+        if host_header:
+            # Connect to the address resolved by the pre-flight check, so
+            # the capture doesn't wait for DNS
+            command += ["-headers", f"Host: {host_header}\r\n"]
+            trace.data["address"] = address
+        command += [
             "-i",
-            url,
+            capture_url,
             "-t",
             str(duration),
             "-acodec",
@@ -147,9 +263,6 @@ def record_stream(name, url, duration, output_dir, metadata):
             output_file,
         ]
 
-        global active_recordings
-        active_recordings.append(name)
-        update_status(active_recordings)
         try:
             # Log the start of the recording
             logging.info(
@@ -159,17 +272,29 @@ def record_stream(name, url, duration, output_dir, metadata):
 
             # Run the command
             process = subprocess.Popen(
-                command, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+                command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
             )
 
-            # Wait for the process to complete
-            stdout, stderr = process.communicate()
+            # Follow ffmpeg's output until it exits, picking up the ICY
+            # track titles and the progress it reports
+            limiter = RepeatLimiter()
+            collector = ChapterCollector(limiter=limiter)
+            trace.watch(collector)
+            collector.consume(process.stderr)
+            limiter.flush()
+            # wait4 rather than wait() for ffmpeg's CPU time and peak RSS
+            _, status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            trace.finish(status, usage)
+            trace.capture_timings(collector)
 
             # Check for errors
             if process.returncode != 0:
+                # Keep the full output with the trace rather than in the log
+                trace.data["ffmpeg_output"] = collector.stderr_tail()
                 raise Exception(
                     f"ffmpeg exited with error code {
-                                process.returncode}: {stderr.decode()}"
+                                process.returncode}: {collector.failure_reason()}"
                 )
 
             logging.info(
@@ -179,7 +304,12 @@ def record_stream(name, url, duration, output_dir, metadata):
 
             # Add metadata only if the file exists
             if os.path.exists(output_file):
+                tagging_started = time.monotonic()
                 try:
+                    from mutagen.mp3 import MP3
+                    from mutagen.id3 import ID3
+                    from mutagen.id3._frames import TPE1, TCON, TIT2, TALB
+
                     audio = MP3(output_file, ID3=ID3)
 
                     # Add ID3 tag if it doesn't exist
@@ -195,6 +325,17 @@ def record_stream(name, url, duration, output_dir, metadata):
                     formatted_title = f"{
                         name} - {recording_time.strftime('%B %d, %Y - %I:%M %p %Z')}"
 
+                    if partial:
+                        formatted_title += " (partial)"
+                        missed = int(time.time() - scheduled_at - audio.info.length)
+                        audio.tags.add(
+                            make_frame(
+                                "comment",
+                                f"Partial recording: the first {missed // 60} "
+                                "minute(s) were missed",
+                            )
+                        )
+
                     audio.tags.add(TIT2(encoding=3, text=formatted_title))
                     audio.tags.add(
                         TPE1(encoding=3, text=metadata.get("artist", "Various Artists"))
@@ -208,109 +349,373 @@ def record_stream(name, url, duration, output_dir, metadata):
                     if "genre" in metadata:
                         audio.tags.add(TCON(encoding=3, text=metadata["genre"]))
 
+                    chapters = collector.finalize(audio.info.length)
+                    add_chapter_frames(audio.tags, chapters)
+
                     audio.save()
+                    if chapters:
+                        write_sidecar(output_file, chapters)
+                        logging.info(
+                            f"Saved {len(chapters)} track chapter(s) for {output_file}"
+                        )
 
                     logging.info(f"Added metadata to {output_file}")
+                    trace.recorded(
+                        audio.info.length, time.monotonic() - tagging_started
+                    )
                 except Exception as e:
                     logging.error(
                         f"Error adding metadata to {
                                   output_file}: {e}"
                     )
+                recorded_file = output_file
+                catalog.update(os.path.basename(output_file))
             else:
                 logging.error(f"Recording file not found: {output_file}")
         except Exception as e:
             logging.error(f"Error recording {name}: {url} - {e}")
+            trace.failed(e)
         finally:
-            active_recordings.remove(name)
+            trace.save(catalog, os.path.basename(output_file))
+            with active_lock:
+                active_recordings.remove(name)
+                active_occurrences.discard(occurrence)
             update_status(active_recordings)
+            if on_finish:
+                on_finish(recorded_file)
 
     # Create and start the recording thread
     recording_thread = threading.Thread(target=_record)
     recording_thread.start()
+    return True
+
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+
+def schedule_weekly(day_of_week, time_of_day, job, *args):
+    getattr(schedule.every(), day_of_week.lower()).at(time_of_day).do(job, *args)
+
+
+def shift_weekly_time(day_of_week, time_of_day, minutes):
+    """Move a weekly "Day", "HH:MM" slot by ``minutes``, wrapping around the week."""
+    hours, mins = map(int, time_of_day.split(":"))
+    total = DAYS.index(day_of_week) * 1440 + hours * 60 + mins + minutes
+    total %= 7 * 1440
+    day, minute_of_day = divmod(total, 1440)
+    return DAYS[day], f"{minute_of_day // 60:02d}:{minute_of_day % 60:02d}"
+
+
+def show_key(show):
+    return show.get("id") or show["name"]
+
+
+def preflight_check(show):
+    """Probe a show's stream and its alternates before the recording starts.
+
+    The first working candidate's final URL (after redirects) and the
+    address its host resolved to are remembered, so the capture can connect
+    to it directly.
+    """
+    candidates = [show["url"]] + show.get("alternate_urls", [])
+    prober = get_prober()
+    for attempt in range(1, PREFLIGHT_ATTEMPTS + 1):
+        results = prober.check(candidates, max_age=0)
+        for url in candidates:
+            result = results[url]
+            if result.ok:
+                preflight_urls[show_key(show)] = (
+                    result.final_url,
+                    result.address,
+                    time.monotonic(),
+                )
+                if url != show["url"]:
+                    logging.warning(
+                        f"Pre-flight for {show['name']}: primary stream failed, "
+                        f"using alternate {url}"
+                    )
+                logging.info(
+                    f"Pre-flight for {show['name']} OK in {result.elapsed:.2f}s, "
+                    f"capturing from {result.final_url} ({result.address})"
+                )
+                return result.final_url
+            logging.warning(
+                f"Pre-flight for {show['name']} (attempt {attempt}): {url} - "
+                f"{result.summary}"
+            )
+        if attempt < PREFLIGHT_ATTEMPTS:
+            time.sleep(PREFLIGHT_RETRY_DELAY)
+
+    logging.error(
+        f"Pre-flight for {show['name']} failed, no working stream among "
+        f"{len(candidates)} URL(s)"
+    )
+    return None
+
+
+def run_preflight(show):
+    threading.Thread(target=preflight_check, args=(show,), daemon=True).start()
+
+
+def start_recording(show, output_dir, metadata, starts_at=None, duration=None):
+    """Record ``show`` now, or with ``duration`` set, the rest of an occurrence
+    that began at ``starts_at`` (the recording is then marked partial)."""
+    url = show["url"]
+    address = None
+    resolved = preflight_urls.pop(show_key(show), None)
+    # Only trust a pre-flight result from this run-up to the show
+    if resolved and time.monotonic() - resolved[2] < (PREFLIGHT_MINUTES + 5) * 60:
+        url, address = resolved[:2]
+    if starts_at is None:
+        # Round to the minute so nodes with slightly skewed clocks agree
+        starts_at = round(time.time() / 60) * 60
+
+    if lease_store is None:
+        record_stream(
+            show["name"],
+            url,
+            duration or show["duration"],
+            output_dir,
+            metadata,
+            scheduled_at=starts_at,
+            partial=duration is not None,
+            show_id=show_key(show),
+            address=address,
+            occurrence=occurrence_id(show, starts_at),
+        )
+        return
+
+    threading.Thread(
+        target=claim_and_record,
+        args=(show, url, starts_at, output_dir, metadata, duration, address),
+        daemon=True,
+    ).start()
+
+
+def at_capacity():
+    return (
+        MAX_CONCURRENT_RECORDINGS > 0
+        and len(active_recordings) >= MAX_CONCURRENT_RECORDINGS
+    )
+
+
+def occurrence_id(show, starts_at):
+    started = datetime.fromtimestamp(starts_at, pytz.utc)
+    return f"{show_key(show)}@{started.strftime('%Y-%m-%dT%H:%MZ')}"
+
+
+def lease_finisher(occurrence):
+    def finished(output_file):
+        with held_leases_lock:
+            held_leases.discard(occurrence)
+        try:
+            if output_file:
+                lease_store.complete(occurrence, os.path.basename(output_file))
+            else:
+                lease_store.fail(occurrence)
+        except Exception as e:
+            logging.error(f"Error releasing lease {occurrence}: {e}")
+
+    return finished
+
+
+def claim_and_record(
+    show, url, starts_at, output_dir, metadata, duration=None, address=None
+):
+    # Busier nodes wait a little so that idle nodes tend to win the claim
+    time.sleep(min(len(active_recordings), 20) * CLAIM_STAGGER)
+    if at_capacity():
+        logging.info(f"At capacity, leaving {show['name']} to another node")
+        return
+
+    occurrence = occurrence_id(show, starts_at)
+    job = {"kind": "recording", "show": show, "metadata": metadata}
+    if not lease_store.claim(occurrence, job, starts_at, starts_at + show["duration"]):
+        logging.info(f"{show['name']} is being recorded by another node")
+        return
+
+    with held_leases_lock:
+        held_leases.add(occurrence)
+    logging.info(f"Claimed {occurrence} on node {NODE_NAME}")
+    record_stream(
+        show["name"],
+        url,
+        duration or show["duration"],
+        output_dir,
+        metadata,
+        on_finish=lease_finisher(occurrence),
+        scheduled_at=starts_at,
+        partial=duration is not None,
+        show_id=show_key(show),
+        address=address,
+        occurrence=occurrence,
+    )
+
+
+def retention_turn(interval):
+    """With several nodes, only the one holding this interval's lease prunes.
+
+    Returns the lease to pass to ``retention_done``, or None to skip the pass.
+    Until then the lease is renewed along with the recordings' leases, as a
+    pass that archives can outlast the lease TTL.
+    """
+    if lease_store is None:
+        return True
+    starts_at = int(time.time() // interval * interval)
+    occurrence = f"retention@{starts_at}"
+    job = {"kind": "retention"}
+    if not lease_store.claim(occurrence, job, starts_at, starts_at + interval):
+        return None
+    with held_leases_lock:
+        held_leases.add(occurrence)
+    return occurrence
+
+
+def retention_done(turn):
+    if lease_store is not None:
+        with held_leases_lock:
+            held_leases.discard(turn)
+        lease_store.complete(turn, None)
+
+
+def take_over(orphan):
+    job = orphan["job"]
+    show = job["show"]
+    if not lease_store.claim(
+        orphan["occurrence"], job, orphan["starts_at"], orphan["ends_at"]
+    ):
+        return
+    remaining = int(orphan["ends_at"] - time.time())
+    logging.warning(
+        f"Taking over {orphan['occurrence']} from "
+        f"{orphan['previous_node']}, {remaining} seconds left"
+    )
+    with held_leases_lock:
+        held_leases.add(orphan["occurrence"])
+    record_stream(
+        show["name"],
+        show["url"],
+        remaining,
+        OUTPUT_DIR,
+        job["metadata"],
+        on_finish=lease_finisher(orphan["occurrence"]),
+        scheduled_at=orphan["starts_at"],
+        partial=True,
+        show_id=show_key(show),
+        occurrence=orphan["occurrence"],
+    )
+
+
+def take_over_orphans():
+    """Record the rest of shows whose node stopped renewing its lease."""
+    for orphan in lease_store.orphans():
+        if at_capacity():
+            break
+        # One bad lease mustn't stop the takeover of the others
+        try:
+            take_over(orphan)
+        except Exception as e:
+            logging.error(f"Error taking over {orphan['occurrence']}: {e}")
+
+
+def maintain_leases():
+    """Renew this node's leases and take over shows orphaned by dead nodes."""
+    while True:
+        try:
+            with held_leases_lock:
+                occurrences = list(held_leases)
+            lease_store.renew(occurrences, len(active_recordings))
+            take_over_orphans()
+        except Exception as e:
+            logging.error(f"Error maintaining leases: {e}")
+        time.sleep(LEASE_TTL / 3)
+
+
+def current_occurrence(show, now=None):
+    """Start of the show's occurrence that is on air at ``now``, or None."""
+    show_tz = pytz.timezone(show["timezone"])
+    now = (now or datetime.now(pytz.utc)).astimezone(show_tz)
+    show_time = datetime.strptime(show["time"], "%I:%M %p").time()
+    weekday = DAYS.index(show["day"])
+    for days_back in range(8):
+        day = now.date() - timedelta(days=days_back)
+        if day.weekday() != weekday:
+            continue
+        starts = show_tz.localize(datetime.combine(day, show_time))
+        if starts <= now < starts + timedelta(seconds=show["duration"]):
+            return starts
+    return None
+
+
+def recover_missed_window(show, output_dir, metadata):
+    """Record the rest of a show whose start this process missed.
+
+    The recording is marked partial. Shows with less than
+    ``RECOVERY_MIN_SECONDS`` left are skipped, as are occurrences already
+    being recorded here (``record_stream`` checks).
+    """
+    starts = current_occurrence(show)
+    if starts is None:
+        return
+    starts_at = starts.timestamp()
+    remaining = int(starts_at + show["duration"] - time.time())
+    if remaining < RECOVERY_MIN_SECONDS:
+        return
+    logging.warning(
+        f"{show['name']} has been on air since {starts.strftime('%H:%M %Z')}, "
+        f"recording the remaining {remaining} seconds"
+    )
+    start_recording(show, output_dir, metadata, starts_at=starts_at, duration=remaining)
+
+
+def recover_missed_windows(config):
+    """Catch up on shows already on air when the recorder starts or reloads."""
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    for show in config["shows"]:
+        try:
+            recover_missed_window(show, OUTPUT_DIR, show_metadata(config, show))
+        except Exception as e:
+            logging.error(f"Error recovering {show['name']}: {e}")
+
+
+def show_metadata(config, show):
+    """Combine default metadata with show-specific metadata."""
+    metadata = config.get("default_metadata", {}).copy()
+    metadata.update(
+        {k: show[k] for k in ["artist", "album", "genre", "timezone"] if k in show}
+    )
+    return metadata
 
 
 # Schedule recordings
 def schedule_recordings(config):
+    """Add each show's weekly recording (and pre-flight check) to the schedule."""
     output_dir = OUTPUT_DIR
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
-    default_metadata = config.get("default_metadata", {})
-
     for show in config["shows"]:
         day_of_week, time_of_day = convert_to_central(
             show["time"], show["day"], show["timezone"]
         )
+        metadata = show_metadata(config, show)
 
-        # Combine default metadata with show-specific metadata
-        metadata = default_metadata.copy()
-        metadata.update(
-            {k: show[k] for k in ["artist", "album", "genre", "timezone"] if k in show}
+        # Schedule the recording
+        schedule_weekly(
+            day_of_week,
+            time_of_day,
+            start_recording,
+            show,
+            output_dir,
+            metadata,
         )
 
-        # Schedule the recording
-        if day_of_week == "Monday":
-            schedule.every().monday.at(time_of_day).do(
-                record_stream,
-                show["name"],
-                show["url"],
-                show["duration"],
-                output_dir,
-                metadata,
-            )
-        elif day_of_week == "Tuesday":
-            schedule.every().tuesday.at(time_of_day).do(
-                record_stream,
-                show["name"],
-                show["url"],
-                show["duration"],
-                output_dir,
-                metadata,
-            )
-        elif day_of_week == "Wednesday":
-            schedule.every().wednesday.at(time_of_day).do(
-                record_stream,
-                show["name"],
-                show["url"],
-                show["duration"],
-                output_dir,
-                metadata,
-            )
-        elif day_of_week == "Thursday":
-            schedule.every().thursday.at(time_of_day).do(
-                record_stream,
-                show["name"],
-                show["url"],
-                show["duration"],
-                output_dir,
-                metadata,
-            )
-        elif day_of_week == "Friday":
-            schedule.every().friday.at(time_of_day).do(
-                record_stream,
-                show["name"],
-                show["url"],
-                show["duration"],
-                output_dir,
-                metadata,
-            )
-        elif day_of_week == "Saturday":
-            schedule.every().saturday.at(time_of_day).do(
-                record_stream,
-                show["name"],
-                show["url"],
-                show["duration"],
-                output_dir,
-                metadata,
-            )
-        elif day_of_week == "Sunday":
-            schedule.every().sunday.at(time_of_day).do(
-                record_stream,
-                show["name"],
-                show["url"],
-                show["duration"],
-                output_dir,
-                metadata,
+        # Check the stream (and resolve redirects) shortly before it starts
+        if PREFLIGHT_MINUTES > 0:
+            schedule_weekly(
+                *shift_weekly_time(day_of_week, time_of_day, -PREFLIGHT_MINUTES),
+                run_preflight,
+                show,
             )
 
         # Log the scheduling
@@ -319,42 +724,46 @@ def schedule_recordings(config):
                      day_of_week} at {time_of_day} Central Time"
         )
 
+
+def run_scheduler():
     while True:
         schedule.run_pending()
         time.sleep(1)
 
 
-def recheck_config():
-    while True:
-        logging.info("Checking configuration...")
-        chicago_tz = pytz.timezone("America/Chicago")
-        now = datetime.now(chicago_tz)  # Timezone aware
+def reload_config():
+    """Load the configuration again, reschedule and catch up on shows on air.
 
-        config = load_config()  # Load the configuration again
+    The schedule is left alone while a recording is about to start.
+    """
+    logging.info("Checking configuration...")
+    chicago_tz = pytz.timezone("America/Chicago")
+    now = datetime.now(chicago_tz)  # Timezone aware
 
-        upcoming_recordings = [
-            (
-                show["name"],
-                *convert_to_central(show["time"], show["day"], show["timezone"]),
-            )
-            for show in config["shows"]
-        ]
-        upcoming_recordings = sorted(
-            [
-                r
-                for r in upcoming_recordings
-                if datetime.strptime(r[2], "%H:%M").time() > now.time()
-            ],
-            key=lambda x: datetime.strptime(x[2], "%H:%M").time(),
+    try:
+        config = load_config()  # Load the configuration again
+    except ConfigError as e:
+        logging.error(f"{e}; keeping the current schedule")
+        return
+
+    upcoming_recordings = [
+        (
+            show["name"],
+            *convert_to_central(show["time"], show["day"], show["timezone"]),
         )
-
-        # Only recheck if no recordings are starting within the next 15 minutes
-        if not upcoming_recordings:
-            schedule.clear()
-            schedule_recordings(config)
-            time.sleep(3600)
-            continue
-
+        for show in config["shows"]
+    ]
+    upcoming_recordings = sorted(
+        [
+            r
+            for r in upcoming_recordings
+            if datetime.strptime(r[2], "%H:%M").time() > now.time()
+        ],
+        key=lambda x: datetime.strptime(x[2], "%H:%M").time(),
+    )
+
+    # Only reschedule if no recordings are starting within the next 15 minutes
+    if upcoming_recordings:
         next_recording_time_str = upcoming_recordings[0][2]
 
         # Convert the string time to a datetime object
@@ -369,29 +778,63 @@ def recheck_config():
         )
 
         time_difference = (next_recording_datetime_aware - now).total_seconds()
+    else:
+        time_difference = None
+
+    if time_difference is None or time_difference > 900:
 
-        if time_difference > 900:
+        schedule.clear()  # Clear the existing schedule
 
-            schedule.clear()  # Clear the existing schedule
+        # Schedule recordings with the new configuration
+        schedule_recordings(config)
 
-            # Schedule recordings with the new configuration
-            schedule_recordings(config)
+    # Shows added (or moved) to a time that is already on air; occurrences
+    # being recorded are skipped
+    recover_missed_windows(config)
 
-        # Sleep for 1 hour before next check
+
+def recheck_config():
+    while True:
+        # Sleep for 1 hour before next check (the config was just loaded)
         time.sleep(3600)  # 1 hour in seconds
+        reload_config()
 
 
 if __name__ == "__main__":
+    try:
+        config = configure()
+    except ConfigError as e:
+        print(f"Error: {e}. Exiting.")
+        sys.exit(1)
     logging.info("Starting the recorder script")
 
+    schedule_recordings(config)
+
+    # Catch up on shows already on air
+    recover_missed_windows(config)
+
     # Start the scheduler in a separate thread
-    scheduler_thread = threading.Thread(target=schedule_recordings, args=(config,))
+    scheduler_thread = threading.Thread(target=run_scheduler)
     scheduler_thread.start()
 
     # Start the recheck configuration task in a separate thread
     recheck_thread = threading.Thread(target=recheck_config)
     recheck_thread.start()
 
+    if "retention" in config:
+        retention_worker = RetentionWorker(catalog, load_config)
+        retention_thread = threading.Thread(
+            target=retention_worker.run_forever,
+            args=(retention_turn, retention_done),
+            daemon=True,
+        )
+        retention_thread.start()
+
+    if lease_store is not None:
+        logging.info(f"Sharing recordings as node {NODE_NAME} via {LEASE_FILE}")
+        lease_thread = threading.Thread(target=maintain_leases, daemon=True)
+        lease_thread.start()
+
     # Keep the main thread alive
     try:
         while True:
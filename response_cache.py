@@ -0,0 +1,128 @@
+import gzip
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; fall back to gzip only
+    brotli = None
+
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 512
+
+
+class CachedBody:
+    """A rendered response body plus its lazily compressed variants.
+
+    ``modified_at`` is when the body last changed, in whole seconds. It never
+    goes backwards for a key, so it is safe to send as Last-Modified.
+    """
+
+    def __init__(self, body, mimetype, previous=None):
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = hashlib.sha1(body).hexdigest()[:20]
+        if previous is None:
+            self.modified_at = int(time.time())
+        elif previous.etag == self.etag:
+            self.modified_at = previous.modified_at
+        else:
+            self.modified_at = max(int(time.time()), previous.modified_at + 1)
+        self._encoded = {}
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding):
+        if encoding == "identity":
+            return self.body
+        with self._lock:
+            if encoding not in self._encoded:
+                if encoding == "br":
+                    self._encoded[encoding] = brotli.compress(self.body, quality=9)
+                else:
+                    self._encoded[encoding] = gzip.compress(self.body, compresslevel=6)
+            return self._encoded[encoding]
+
+
+class ResponseCache:
+    """Rendered responses keyed by name, valid for a single version.
+
+    ``version`` is any hashable value describing the state the body was
+    rendered from (catalog version, config version, a time bucket...).
+    A lookup with a different version re-renders and replaces the entry.
+    """
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version, render, mimetype="text/html"):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        body = render()
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        cached = CachedBody(body, mimetype, entry[1] if entry else None)
+
+        with self._lock:
+            self._entries[key] = (version, cached)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return cached
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def choose_encoding(body_size):
+    if body_size < MIN_COMPRESS_SIZE:
+        return "identity"
+    offered = ["br", "gzip"] if brotli is not None else ["gzip"]
+    return request.accept_encodings.best_match(offered, default="identity")
+
+
+def not_modified(etags, last_modified):
+    if request.if_none_match:
+        return any(request.if_none_match.contains(etag) for etag in etags)
+    # If-Modified-Since only counts when the client sent no ETag
+    if last_modified is not None and request.if_modified_since is not None:
+        return last_modified <= request.if_modified_since.timestamp()
+    return False
+
+
+def cached_response(
+    cache, key, version, render, mimetype="text/html", last_modified=False
+):
+    """Serve ``render()`` from ``cache``, compressed and with ETag/304 support.
+
+    ``last_modified=True`` also sends Last-Modified (when the body last
+    changed) and honours If-Modified-Since.
+    """
+    cached = cache.get(key, version, render, mimetype)
+    encoding = choose_encoding(len(cached.body))
+    etag = cached.etag if encoding == "identity" else f"{cached.etag}-{encoding}"
+    last_modified = cached.modified_at if last_modified else None
+
+    if not_modified((etag, cached.etag), last_modified):
+        response = Response(status=304)
+    else:
+        response = Response(cached.encoded(encoding), mimetype=mimetype)
+        if encoding != "identity":
+            response.headers["Content-Encoding"] = encoding
+
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = "no-cache"
+    return response
@@ -0,0 +1,195 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+TAG_FRAMES = {
+    "title": "TIT2",
+    "artist": "TPE1",
+    "album": "TALB",
+    "genre": "TCON",
+    "year": "TYER",
+    "comment": "COMM",
+}
+
+# Headroom left when a tag no longer fits, so later edits stay in place
+TAG_PADDING = 1024
+
+FILTER_KEYS = {"show", "date_from", "date_to", "tags"}
+
+
+def make_frame(field, value):
+    from mutagen.id3._frames import Frames
+
+    frame_class = Frames[TAG_FRAMES[field]]
+    if field == "comment":
+        return frame_class(encoding=3, lang="eng", desc="comment", text=value)
+    return frame_class(encoding=3, text=value)
+
+
+def keep_padding(info):
+    # A non-negative padding means the new tag fits in the old tag's space,
+    # so mutagen can update it in place without rewriting the audio.
+    return info.padding if info.padding >= 0 else TAG_PADDING
+
+
+def write_tags(file_path, changes):
+    """Set the given tag fields (see ``TAG_FRAMES``), reusing ID3 padding."""
+    from mutagen.id3 import ID3, ID3NoHeaderError
+
+    try:
+        tags = ID3(file_path)
+    except ID3NoHeaderError:
+        tags = ID3()
+    for field, value in changes.items():
+        frame = make_frame(field, value)
+        if field == "comment":
+            # Only replace our own comment, not e.g. encoder comments
+            for key in list(tags):
+                if key == "COMM" or key.startswith("COMM:comment:"):
+                    del tags[key]
+            tags.add(frame)
+        else:
+            tags.setall(frame.FrameID, [frame])
+    tags.save(file_path, padding=keep_padding)
+
+
+def matches(recording, filters):
+    """Whether a catalog entry matches a bulk-edit filter.
+
+    Supported keys: ``show``, ``date_from`` and ``date_to`` (YYYY-MM-DD,
+    inclusive) and ``tags``, a dict of exact current tag values.
+    """
+    if "show" in filters and recording["show"] != filters["show"]:
+        return False
+    day = recording["date"][:10]
+    if filters.get("date_from") and day < filters["date_from"]:
+        return False
+    if filters.get("date_to") and day > filters["date_to"]:
+        return False
+    for field, value in filters.get("tags", {}).items():
+        if recording["tags"].get(field, "") != value:
+            return False
+    return True
+
+
+def check_filter(filters):
+    """Raise ValueError unless ``filters`` has the shape ``matches`` expects.
+
+    Unknown keys are rejected too: a misspelt key would otherwise be ignored
+    and the edit applied to every recording.
+    """
+    if not isinstance(filters, dict):
+        raise ValueError("The filter must be an object")
+    unknown = set(filters) - FILTER_KEYS
+    if unknown:
+        raise ValueError(f"Unknown filter keys: {', '.join(sorted(unknown))}")
+    for key in ("show", "date_from", "date_to"):
+        if key in filters and not isinstance(filters[key], str):
+            raise ValueError(f"The filter's {key} must be a string")
+    tags = filters.get("tags", {})
+    if not isinstance(tags, dict) or not all(
+        isinstance(value, str) for value in tags.values()
+    ):
+        raise ValueError("The filter's tags must map tag fields to values")
+    unknown = set(tags) - set(TAG_FRAMES)
+    if unknown:
+        raise ValueError(f"Unknown tag fields: {', '.join(sorted(unknown))}")
+
+
+class RetagJob:
+    def __init__(self, filenames, changes):
+        self.id = uuid.uuid4().hex[:12]
+        self.filenames = filenames
+        self.changes = changes
+        self.done = 0
+        self.failed = []
+        self.started_at = time.time()
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def status(self):
+        return "finished" if self.finished_at else "running"
+
+    def record(self, filename, error=None):
+        with self._lock:
+            self.done += 1
+            if error:
+                self.failed.append({"filename": filename, "error": error})
+            if self.done == len(self.filenames):
+                self.finished_at = time.time()
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "id": self.id,
+                "status": self.status,
+                "total": len(self.filenames),
+                "done": self.done,
+                "failed": list(self.failed),
+                "changes": self.changes,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+
+
+class RetagManager:
+    """Runs bulk tag edits on a thread pool and tracks their progress."""
+
+    def __init__(self, catalog, max_workers=4, keep_jobs=50):
+        self.catalog = catalog
+        self.keep_jobs = keep_jobs
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="retag"
+        )
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, filters, changes):
+        """Start retagging the recordings matching ``filters``.
+
+        Raises ValueError if ``filters`` or ``changes`` are malformed.
+        """
+        check_filter(filters)
+        if not isinstance(changes, dict) or not all(
+            isinstance(value, str) for value in changes.values()
+        ):
+            raise ValueError("Changes must map tag fields to new values")
+        unknown = set(changes) - set(TAG_FRAMES)
+        if unknown:
+            raise ValueError(f"Unknown tag fields: {', '.join(sorted(unknown))}")
+        filenames = [
+            recording["filename"]
+            for recording in self.catalog.list_recordings()
+            if matches(recording, filters)
+        ]
+        job = RetagJob(filenames, changes)
+        if not filenames:
+            job.finished_at = time.time()
+
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.keep_jobs:
+                del self._jobs[next(iter(self._jobs))]
+
+        for filename in filenames:
+            self._executor.submit(self._retag, job, filename)
+        logging.info(f"Retag job {job.id}: {len(filenames)} file(s), {changes}")
+        return job
+
+    def _retag(self, job, filename):
+        try:
+            write_tags(os.path.join(self.catalog.recordings_dir, filename), job.changes)
+            self.catalog.update(filename)
+            job.record(filename)
+        except Exception as e:
+            logging.error(f"Retag job {job.id}: error tagging {filename}: {e}")
+            job.record(filename, str(e))
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
@@ -0,0 +1,242 @@
+import logging
+import os
+import subprocess
+import tempfile
+import time
+from chapters import delete_sidecar
+
+
+# Policy keys that can be set globally under "retention" or per show.
+# 0 disables a rule.
+SHOW_POLICY_DEFAULTS = {
+    "keep_latest": 0,
+    "max_age_days": 0,
+    "archive_after_days": 0,
+}
+
+GLOBAL_DEFAULTS = {
+    "disk_budget_gb": 0,
+    # Start pruning above high water, stop once below low water (% of budget)
+    "high_water_percent": 90,
+    "low_water_percent": 80,
+    "archive_bitrate": "48k",
+    # Fraction of one CPU the archive encoder may use on average
+    "cpu_budget": 0.25,
+    "interval_minutes": 60,
+}
+
+# Files modified this recently may still be being recorded
+GRACE_SECONDS = 600
+
+
+def parse_bitrate(bitrate):
+    bitrate = str(bitrate).lower()
+    if bitrate.endswith("k"):
+        return int(float(bitrate[:-1]) * 1000)
+    return int(bitrate)
+
+
+def retention_settings(config):
+    settings = GLOBAL_DEFAULTS.copy()
+    settings.update(SHOW_POLICY_DEFAULTS)
+    settings.update(config.get("retention", {}))
+    return settings
+
+
+def show_policy(config, show_name):
+    settings = retention_settings(config)
+    policy = {key: settings[key] for key in SHOW_POLICY_DEFAULTS}
+    for show in config.get("shows", []):
+        if show["name"] == show_name:
+            policy.update(show.get("retention", {}))
+            break
+    return policy
+
+
+def plan_retention(recordings, config, now=None):
+    """Decide what to delete and what to archive.
+
+    ``recordings`` are catalog entries. Returns ``(deletions, archives)``,
+    where ``deletions`` is a list of ``(recording, reason)`` pairs and
+    ``archives`` a list of recordings to re-encode.
+    """
+    now = now or time.time()
+    settings = retention_settings(config)
+    archive_bitrate = parse_bitrate(settings["archive_bitrate"])
+
+    by_show = {}
+    for recording in recordings:
+        if now - recording["mtime"] < GRACE_SECONDS:
+            continue
+        by_show.setdefault(recording["show"], []).append(recording)
+
+    deletions = []
+    archives = []
+    kept = []
+    for show_name, show_recordings in by_show.items():
+        policy = show_policy(config, show_name)
+        show_recordings.sort(key=lambda r: r["mtime"], reverse=True)
+        for position, recording in enumerate(show_recordings):
+            age_days = (now - recording["mtime"]) / 86400
+            if policy["keep_latest"] and position >= policy["keep_latest"]:
+                deletions.append(
+                    (recording, f"more than {policy['keep_latest']} kept")
+                )
+            elif policy["max_age_days"] and age_days > policy["max_age_days"]:
+                deletions.append(
+                    (recording, f"older than {policy['max_age_days']} days")
+                )
+            else:
+                kept.append(recording)
+                already_compact = (
+                    0 < recording["bitrate"] <= archive_bitrate + 1000
+                )
+                if (
+                    policy["archive_after_days"]
+                    and age_days > policy["archive_after_days"]
+                    and not already_compact
+                ):
+                    archives.append(recording)
+
+    budget = settings["disk_budget_gb"] * 2**30
+    if budget:
+        total = sum(r["size"] for r in kept)
+        if total > budget * settings["high_water_percent"] / 100:
+            low_water = budget * settings["low_water_percent"] / 100
+            for recording in sorted(kept, key=lambda r: r["mtime"]):
+                if total <= low_water:
+                    break
+                deletions.append((recording, "over the disk budget"))
+                total -= recording["size"]
+                if recording in archives:
+                    archives.remove(recording)
+
+    return deletions, archives
+
+
+class RetentionWorker:
+    """Applies retention policies to the recordings in the catalog.
+
+    Candidates come from the catalog rather than a directory scan. Archiving
+    re-encodes a recording in place at ``archive_bitrate`` (mono MP3, tags
+    kept) under ``nice``, and sleeps between encodes so the encoder stays
+    within ``cpu_budget``.
+    """
+
+    def __init__(self, catalog, load_config):
+        self.catalog = catalog
+        self.load_config = load_config
+
+    def run_once(self):
+        config = self.load_config()
+        settings = retention_settings(config)
+        recordings = self.catalog.list_recordings(refresh=False)
+        deletions, archives = plan_retention(recordings, config)
+
+        for recording, reason in deletions:
+            self.delete(recording, reason)
+        for recording in archives:
+            self.archive(recording, settings)
+        return len(deletions), len(archives)
+
+    def delete(self, recording, reason):
+        file_path = os.path.join(self.catalog.recordings_dir, recording["filename"])
+        try:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            delete_sidecar(file_path)
+            self.catalog.remove(recording["filename"])
+            logging.info(f"Retention: deleted {recording['filename']} ({reason})")
+        except OSError as e:
+            logging.error(f"Retention: error deleting {recording['filename']}: {e}")
+
+    def archive(self, recording, settings):
+        file_path = os.path.join(self.catalog.recordings_dir, recording["filename"])
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(file_path),
+            prefix=f".{recording['filename']}.",
+            suffix=".archive.tmp",
+        )
+        os.close(fd)
+        # nice(1) rather than preexec_fn, which isn't safe in a threaded process
+        command = [
+            "nice",
+            "-n",
+            "19",
+            "ffmpeg",
+            "-y",
+            "-v",
+            "error",
+            "-i",
+            file_path,
+            "-map_metadata",
+            "0",
+            "-id3v2_version",
+            "3",
+            "-ac",
+            "1",
+            "-b:a",
+            str(settings["archive_bitrate"]),
+            "-acodec",
+            "libmp3lame",
+            "-threads",
+            "1",
+            "-f",
+            "mp3",
+            tmp_path,
+        ]
+        started = time.monotonic()
+        try:
+            original = os.stat(file_path)
+            process = subprocess.run(
+                command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+            )
+            if process.returncode != 0:
+                raise Exception(process.stderr.decode(errors="replace")[-500:])
+            if os.path.getsize(tmp_path) >= original.st_size:
+                os.remove(tmp_path)
+                logging.info(
+                    f"Retention: {recording['filename']} is already compact"
+                )
+                return
+            os.replace(tmp_path, file_path)
+            # Keep the original date, which the web interface sorts by
+            os.utime(file_path, ns=(original.st_atime_ns, original.st_mtime_ns))
+            self.catalog.update(recording["filename"])
+            logging.info(
+                f"Retention: archived {recording['filename']} "
+                f"({original.st_size} -> {os.path.getsize(file_path)} bytes)"
+            )
+        except Exception as e:
+            logging.error(f"Retention: error archiving {recording['filename']}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        finally:
+            elapsed = time.monotonic() - started
+            budget = min(max(settings["cpu_budget"], 0.01), 1)
+            time.sleep(elapsed * (1 - budget) / budget)
+
+    def run_forever(self, should_run=None, finished=None):
+        """Run every ``interval_minutes``.
+
+        ``should_run(seconds)`` can veto a pass by returning a false value;
+        otherwise its result is passed to ``finished`` once the pass is over.
+        """
+        interval = GLOBAL_DEFAULTS["interval_minutes"]
+        while True:
+            try:
+                interval = retention_settings(self.load_config())["interval_minutes"]
+                turn = should_run(interval * 60) if should_run else True
+                if turn:
+                    try:
+                        deleted, archived = self.run_once()
+                    finally:
+                        if finished:
+                            finished(turn)
+                    if deleted or archived:
+                        logging.info(
+                            f"Retention: deleted {deleted}, archived {archived}"
+                        )
+            except Exception as e:
+                logging.error(f"Retention: error applying policies: {e}")
+            time.sleep(interval * 60)
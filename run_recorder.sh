@@ -49,14 +49,16 @@ fi
 # Change to the base directory
 cd "$BASE_DIR" || exit 1
 
-# Create the debug log if it doesn't exist
-if [ ! -f "$DEBUG_LOG" ]; then
-  touch "$DEBUG_LOG"
-fi
+# The configured log file is the recorder's own rotated JSON log, so this
+# script and each process's console output get separate files next to it
+LOG_STEM="${DEBUG_LOG%.log}"
+RUN_LOG="$LOG_STEM-run.log"
+RECORDER_OUT="$LOG_STEM-recorder.out"
+WEB_OUT="$LOG_STEM-web.out"
 
 # Add a function to log messages, as this keeps the main script cleaner
 log() {
-  echo "$(date) - $1" >> "$DEBUG_LOG"
+  echo "$(date) - $1" >> "$RUN_LOG"
 }
 
 log "Script started"
@@ -88,11 +90,11 @@ export FLASK_DEBUG=0  # Set to "1" for debug mode (development only!)
 
 # Run the Python scripts
 log "Starting recorder.py"
-python3 recorder.py >> "$DEBUG_LOG" 2>&1 &  # Run in background
+python3 recorder.py >> "$RECORDER_OUT" 2>&1 &  # Run in background
 RECORDER_PID=$! #Capture process id
 
 log "Starting app.py (Flask web app)"
-flask run  >> "$DEBUG_LOG" 2>&1 # Run in the foreground. Prevents it from closing immediately.
+flask run  >> "$WEB_OUT" 2>&1 # Run in the foreground. Prevents it from closing immediately.
 exit_code=$?
 
 log "App.py finished with exit code $exit_code"
@@ -1,10 +1,9 @@
 import json
 from datetime import datetime, timedelta
 import pytz
-import requests
-import concurrent.futures
 import calendar
 from collections import defaultdict
+from stream_probe import get_prober
 
 
 def load_config(filename):
@@ -12,30 +11,9 @@ def load_config(filename):
         return json.load(f)
 
 
-def test_link(url, retries=3):
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:129.0) Gecko/20100101 Firefox/129.0',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.5',
-        'Connection': 'keep-alive',
-    }
-    for attempt in range(retries):
-        try:
-            response = requests.get(
-                url, timeout=10, headers=headers, stream=True)
-            content_type = response.headers.get('Content-Type', '')
-
-            if response.status_code == 200:
-                if 'audio' in content_type or 'video' in content_type or 'application/octet-stream' in content_type:
-                    return "✅", f"Status: {response.status_code}, Content-Type: {content_type}"
-                else:
-                    return "❓", f"Status: {response.status_code}, Content-Type: {content_type} (Not an audio stream?)"
-            else:
-                return "❌", f"Status: {response.status_code}, Content-Type: {content_type}"
-        except requests.RequestException as e:
-            if attempt == retries - 1:
-                return "❌", str(e)
-    return "❌", "Max retries reached"
+def test_link(url):
+    result = get_prober().check_one(url)
+    return result.symbol, result.summary
 
 
 def get_next_show_datetime(show, now):
@@ -92,26 +70,16 @@ def print_schedule(schedule):
           (datetime.now(pytz.timezone('America/Chicago')) + timedelta(days=7)).strftime('%A, %B %d, %Y')})\n")
     print("Testing links... This may take a moment.\n")
 
-    all_shows = [show for day in schedule for show in day[1]]
-
-    with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-        future_to_show = {executor.submit(
-            test_link, show[3]): show for show in all_shows}
-
-        results = {}
-        for future in concurrent.futures.as_completed(future_to_show):
-            show = future_to_show[future]
-            try:
-                link_status, status_info = future.result(timeout=15)
-            except concurrent.futures.TimeoutError:
-                link_status, status_info = "⏳", "Timeout"
-            results[show] = (link_status, status_info)
+    # Each unique URL is probed once, concurrently
+    urls = [show[3] for day in schedule for show in day[1]]
+    probes = get_prober().check(urls)
+    results = {url: (probe.symbol, probe.summary) for url, probe in probes.items()}
 
     for day, shows in schedule:
         print(f"{day.strftime('%A, %B %d, %Y')}")
         for show in shows:
             show_name, show_datetime_central, show_datetime_original, url, timezone = show
-            link_status, status_info = results[show]
+            link_status, status_info = results[url]
             print(f"{link_status} {show_name}")
             print(f"   Local time (CDT): {
                   show_datetime_central.strftime('%I:%M %p')}")
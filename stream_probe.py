@@ -0,0 +1,374 @@
+import asyncio
+import socket
+import ssl
+import threading
+import time
+from dataclasses import dataclass, field
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+
+USER_AGENT = (
+    "Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:129.0) Gecko/20100101 Firefox/129.0"
+)
+
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+AUDIO_CONTENT_TYPES = ("audio", "video", "application/octet-stream", "application/ogg")
+
+
+@dataclass
+class ProbeResult:
+    url: str
+    ok: bool
+    status: int = 0
+    content_type: str = ""
+    final_url: str = ""
+    # IP address the final URL's host resolved to
+    address: str = ""
+    error: str = ""
+    elapsed: float = 0.0
+    sniffed_audio: bool = False
+    headers: dict = field(default_factory=dict)
+    checked_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def symbol(self):
+        if self.error == "Timeout":
+            return "⏳"
+        if self.ok:
+            return "✅"
+        if self.status == 200:
+            return "❓"
+        return "❌"
+
+    @property
+    def summary(self):
+        if self.error:
+            return self.error
+        info = f"Status: {self.status}, Content-Type: {self.content_type}"
+        if self.status == 200 and not self.ok:
+            info += " (Not an audio stream?)"
+        return info
+
+
+def pinned_url(url, address):
+    """``url`` with its host replaced by ``address``, and the Host header to send.
+
+    Lets the capture connect without a DNS lookup of its own. Only plain HTTP
+    URLs are rewritten, since HTTPS needs the host name for TLS (SNI and the
+    certificate check); for anything else ``(url, None)`` is returned.
+    """
+    parts = urlsplit(url)
+    if (
+        parts.scheme.lower() != "http"
+        or not address
+        or parts.hostname in (None, address)
+        or "@" in parts.netloc
+    ):
+        return url, None
+    host = f"[{address}]" if ":" in address else address
+    netloc = host if parts.port is None else f"{host}:{parts.port}"
+    return urlunsplit(parts._replace(netloc=netloc)), parts.netloc
+
+
+def looks_like_audio(data):
+    """Recognise the start of an MP3, AAC or Ogg stream."""
+    if data.startswith((b"ID3", b"OggS")):
+        return True
+    # MPEG audio / ADTS frame sync: 11 set bits
+    for i in range(min(len(data) - 1, 2048)):
+        if data[i] == 0xFF and data[i + 1] & 0xE0 == 0xE0:
+            return True
+    return False
+
+
+class ConnectionPool:
+    """Keep-alive HTTP connections per (scheme, host, port) with a DNS cache.
+
+    Stream bodies never end, so a connection that delivered audio is always
+    closed; connections that only carried a redirect or a short response are
+    kept for the next request to the same host.
+    """
+
+    def __init__(self, limit_per_host=4, idle_timeout=30, dns_ttl=300):
+        self.limit_per_host = limit_per_host
+        self.idle_timeout = idle_timeout
+        self.dns_ttl = dns_ttl
+        self._idle = {}
+        self._limits = {}
+        self._dns = {}
+        self._ssl_context = ssl.create_default_context()
+
+    async def resolve(self, host, port):
+        cached = self._dns.get((host, port))
+        if cached and time.monotonic() - cached[1] < self.dns_ttl:
+            return cached[0]
+        loop = asyncio.get_running_loop()
+        infos = await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        address = infos[0][4][0]
+        self._dns[(host, port)] = (address, time.monotonic())
+        return address
+
+    async def acquire(self, scheme, host, port):
+        key = (scheme, host, port)
+        limit = self._limits.setdefault(
+            key, asyncio.Semaphore(self.limit_per_host)
+        )
+        await limit.acquire()
+        try:
+            idle = self._idle.get(key, [])
+            while idle:
+                reader, writer, since = idle.pop()
+                if (
+                    time.monotonic() - since < self.idle_timeout
+                    and not writer.is_closing()
+                    and not reader.at_eof()
+                ):
+                    return reader, writer
+                writer.close()
+
+            address = await self.resolve(host, port)
+            if scheme == "https":
+                return await asyncio.open_connection(
+                    address, port, ssl=self._ssl_context, server_hostname=host
+                )
+            return await asyncio.open_connection(address, port)
+        except BaseException:
+            limit.release()
+            raise
+
+    def release(self, scheme, host, port, reader, writer, reusable):
+        key = (scheme, host, port)
+        if reusable and not writer.is_closing():
+            self._idle.setdefault(key, []).append((reader, writer, time.monotonic()))
+        else:
+            writer.close()
+        self._limits[key].release()
+
+    def close(self):
+        for idle in self._idle.values():
+            for _, writer, _ in idle:
+                writer.close()
+        self._idle.clear()
+
+
+class StreamProber:
+    """Checks stream URLs concurrently on a private asyncio loop.
+
+    Each unique URL is fetched once: redirects are followed, then only the
+    response headers and the first ``sniff_bytes`` of the body are read.
+    Results are cached for ``ttl`` seconds (``failure_ttl`` for failures).
+    Safe to call from any thread via ``check``/``check_one``.
+    """
+
+    def __init__(
+        self,
+        ttl=300,
+        failure_ttl=30,
+        timeout=10,
+        concurrency=32,
+        sniff_bytes=4096,
+        max_redirects=5,
+        retries=1,
+        retry_backoff=1.0,
+    ):
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.sniff_bytes = sniff_bytes
+        self.max_redirects = max_redirects
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self._cache = {}
+        self._inflight = {}
+        self._loop = None
+        self._pool = None
+        self._semaphore = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=self._loop.run_forever, name="stream-prober", daemon=True
+                )
+                thread.start()
+        return self._loop
+
+    def _cached(self, url, max_age):
+        result = self._cache.get(url)
+        if result is None:
+            return None
+        if max_age is None:
+            max_age = self.ttl if result.ok else self.failure_ttl
+        if time.monotonic() - result.checked_at < max_age:
+            return result
+        return None
+
+    async def _request(self, url):
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported URL scheme: {parts.scheme}")
+        host = parts.hostname
+        port = parts.port or (443 if scheme == "https" else 80)
+        path = parts.path or "/"
+        if parts.query:
+            path += f"?{parts.query}"
+        host_header = host if parts.port is None else f"{host}:{parts.port}"
+
+        reader, writer = await self._pool.acquire(scheme, host, port)
+        reusable = False
+        try:
+            address = writer.get_extra_info("peername")[0]
+            writer.write(
+                (
+                    f"GET {path} HTTP/1.1\r\n"
+                    f"Host: {host_header}\r\n"
+                    f"User-Agent: {USER_AGENT}\r\n"
+                    "Accept: */*\r\n"
+                    "Connection: keep-alive\r\n\r\n"
+                ).encode("latin-1")
+            )
+            await writer.drain()
+
+            head = await reader.readuntil(b"\r\n\r\n")
+            lines = head.decode("latin-1").split("\r\n")
+            # Shoutcast servers answer with "ICY 200 OK"
+            protocol, status = lines[0].split(" ", 2)[:2]
+            headers = {}
+            for line in lines[1:]:
+                if ":" in line:
+                    name, value = line.split(":", 1)
+                    headers[name.strip().lower()] = value.strip()
+            status = int(status)
+
+            body = b""
+            length = headers.get("content-length")
+            if status in REDIRECT_CODES or status >= 400:
+                # Drain short bodies so the connection can be reused
+                if length is not None and int(length) <= 65536:
+                    body = await reader.readexactly(int(length))
+                    reusable = (
+                        protocol == "HTTP/1.1"
+                        and headers.get("connection", "").lower() != "close"
+                    )
+            else:
+                wanted = self.sniff_bytes
+                if length is not None:
+                    wanted = min(wanted, int(length))
+                while len(body) < wanted:
+                    chunk = await reader.read(wanted - len(body))
+                    if not chunk:
+                        break
+                    body += chunk
+                reusable = (
+                    length is not None
+                    and len(body) == int(length)
+                    and protocol == "HTTP/1.1"
+                    and headers.get("connection", "").lower() != "close"
+                )
+            return status, headers, body, address
+        finally:
+            self._pool.release(scheme, host, port, reader, writer, reusable)
+
+    async def _probe(self, url):
+        started = time.monotonic()
+        current = url
+        try:
+            for _ in range(self.max_redirects + 1):
+                status, headers, body, address = await self._request(current)
+                if status in REDIRECT_CODES and "location" in headers:
+                    current = urljoin(current, headers["location"])
+                    continue
+                break
+            else:
+                return ProbeResult(
+                    url, False, status, final_url=current, error="Too many redirects"
+                )
+
+            content_type = headers.get("content-type", "")
+            sniffed = status == 200 and looks_like_audio(body)
+            ok = status == 200 and (
+                any(t in content_type for t in AUDIO_CONTENT_TYPES) or sniffed
+            )
+            return ProbeResult(
+                url,
+                ok,
+                status,
+                content_type,
+                final_url=current,
+                address=address,
+                elapsed=time.monotonic() - started,
+                sniffed_audio=sniffed,
+                headers=headers,
+            )
+        except Exception as e:
+            return ProbeResult(
+                url,
+                False,
+                final_url=current,
+                error=str(e) or type(e).__name__,
+                elapsed=time.monotonic() - started,
+            )
+
+    async def _probe_limited(self, url):
+        async with self._semaphore:
+            for attempt in range(self.retries + 1):
+                try:
+                    result = await asyncio.wait_for(self._probe(url), self.timeout)
+                except asyncio.TimeoutError:
+                    result = ProbeResult(url, False, final_url=url, error="Timeout")
+                # Only connection-level errors are worth retrying
+                if not result.error or result.error == "Timeout":
+                    break
+                if attempt < self.retries:
+                    await asyncio.sleep(self.retry_backoff * 2**attempt)
+        self._cache[url] = result
+        return result
+
+    async def check_async(self, urls, max_age=None):
+        if self._pool is None:
+            self._pool = ConnectionPool()
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        results = {}
+        pending = {}
+        for url in dict.fromkeys(urls):
+            cached = self._cached(url, max_age)
+            if cached is not None:
+                results[url] = cached
+                continue
+            task = self._inflight.get(url)
+            if task is None:
+                task = asyncio.ensure_future(self._probe_limited(url))
+                self._inflight[url] = task
+                task.add_done_callback(lambda _, url=url: self._inflight.pop(url, None))
+            pending[url] = task
+
+        for url, task in pending.items():
+            results[url] = await task
+        return results
+
+    def check(self, urls, max_age=None):
+        """Probe ``urls`` (duplicates are checked once) and return {url: result}."""
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(self.check_async(urls, max_age), loop)
+        return future.result()
+
+    def check_one(self, url, max_age=None):
+        return self.check([url], max_age)[url]
+
+
+_prober = None
+_prober_lock = threading.Lock()
+
+
+def get_prober():
+    """Process-wide prober so every caller shares one pool and cache."""
+    global _prober
+    with _prober_lock:
+        if _prober is None:
+            _prober = StreamProber()
+        return _prober
@@ -1,4 +1,3 @@
-import recorder
 import os
 import json
 import time
@@ -7,26 +6,20 @@ import threading
 import http.server
 import socketserver
 import logging
-from pydub.generators import Sine
 import shutil
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-)
-
 
 # Generate a simple MP3 file with a sine wave tone
 def generate_tone_mp3(filename, duration=60, freq=440):
+    from pydub.generators import Sine
+
     sine_wave = Sine(freq).to_audio_segment(
         duration=duration * 1000
     )  # duration in milliseconds
     sine_wave.export(filename, format="mp3")
 
 
-# Generate the MP3 file
 mp3_filename = "test_tone.mp3"
-generate_tone_mp3(mp3_filename)
 
 
 # Simulated stream server
@@ -59,57 +52,69 @@ def run_simulated_stream_server():
         httpd.serve_forever()
 
 
-# Start the simulated stream server in a separate thread
-stream_thread = threading.Thread(target=run_simulated_stream_server)
-# This allows the thread to be terminated when the main program exits
-stream_thread.daemon = True
-stream_thread.start()
-
-# Create a test configuration
-test_config = {
-    "shows": [
-        {
-            "name": "Test Show 1",
-            "url": "http://localhost:8000",
-            "day": (datetime.now() + timedelta(minutes=1)).strftime("%A"),
-            "time": (datetime.now() + timedelta(minutes=1)).strftime("%I:%M %p"),
-            "timezone": "America/Chicago",
-            "duration": 30,
-            "artist": "Test Artist",
-            "album": "Test Album",
-            "genre": "Test Genre",
-        },
-        {
-            "name": "Test Show 2",
-            "url": "http://localhost:8000",
-            "day": (datetime.now() + timedelta(hours=1, minutes=2)).strftime("%A"),
-            "time": (datetime.now() + timedelta(hours=1, minutes=2)).strftime(
-                "%I:%M %p"
-            ),
-            "timezone": "America/New_York",
-            "duration": 30,
-            "artist": "Test Artist 2",
-            "album": "Test Album 2",
-            "genre": "Test Genre 2",
-        },
-    ]
-}
-
-# Write the test configuration to a file
-with open("test_config.json", "w") as f:
-    json.dump(test_config, f, indent=2)
-
-# Set environment variables
-os.environ["RADIOJOE_BASE_DIR"] = os.getcwd()
-os.environ["RADIOJOE_CONFIG_FILE"] = os.path.join(os.getcwd(), "test_config.json")
-os.environ["RADIOJOE_OUTPUT_DIR"] = os.path.join(os.getcwd(), "test_recordings")
-os.environ["RADIOJOE_LOG_FILE"] = os.path.join(os.getcwd(), "test_recorder.log")
-
-# Ensure the output directory exists
-os.makedirs(os.environ["RADIOJOE_OUTPUT_DIR"], exist_ok=True)
-
-# Import and run the recorder
-if __name__ == "__main__":
+def main():
+    # Configure logging
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+
+    # Generate the MP3 file
+    generate_tone_mp3(mp3_filename)
+
+    # Start the simulated stream server in a separate thread
+    stream_thread = threading.Thread(target=run_simulated_stream_server)
+    # This allows the thread to be terminated when the main program exits
+    stream_thread.daemon = True
+    stream_thread.start()
+
+    # Create a test configuration
+    test_config = {
+        "shows": [
+            {
+                "name": "Test Show 1",
+                "url": "http://localhost:8000",
+                "day": (datetime.now() + timedelta(minutes=1)).strftime("%A"),
+                "time": (datetime.now() + timedelta(minutes=1)).strftime("%I:%M %p"),
+                "timezone": "America/Chicago",
+                "duration": 30,
+                "artist": "Test Artist",
+                "album": "Test Album",
+                "genre": "Test Genre",
+            },
+            {
+                "name": "Test Show 2",
+                "url": "http://localhost:8000",
+                "day": (datetime.now() + timedelta(hours=1, minutes=2)).strftime("%A"),
+                "time": (datetime.now() + timedelta(hours=1, minutes=2)).strftime(
+                    "%I:%M %p"
+                ),
+                "timezone": "America/New_York",
+                "duration": 30,
+                "artist": "Test Artist 2",
+                "album": "Test Album 2",
+                "genre": "Test Genre 2",
+            },
+        ]
+    }
+
+    # Write the test configuration to a file
+    with open("test_config.json", "w") as f:
+        json.dump(test_config, f, indent=2)
+
+    # Set environment variables
+    os.environ["RADIOJOE_BASE_DIR"] = os.getcwd()
+    os.environ["RADIOJOE_CONFIG_FILE"] = os.path.join(os.getcwd(), "test_config.json")
+    os.environ["RADIOJOE_OUTPUT_DIR"] = os.path.join(os.getcwd(), "test_recordings")
+    os.environ["RADIOJOE_LOG_FILE"] = os.path.join(os.getcwd(), "test_recorder.log")
+
+    # Ensure the output directory exists
+    os.makedirs(os.environ["RADIOJOE_OUTPUT_DIR"], exist_ok=True)
+
+    # Import and run the recorder once the environment points at the test config
+    import recorder
+
+    recorder.configure()
+
     logging.info("Starting recorder test...")
     recorder_thread = threading.Thread(
         target=recorder.schedule_recordings, args=(test_config,)
@@ -165,3 +170,7 @@ if __name__ == "__main__":
 
     # Force quit the program
     os._exit(0)
+
+
+if __name__ == "__main__":
+    main()
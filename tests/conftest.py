@@ -0,0 +1,113 @@
+import io
+import json
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# One silent MPEG-1 Layer III frame, 128 kbps at 44.1 kHz (about 26 ms)
+SILENT_FRAME = b"\xff\xfb\x90\x64" + b"\x00" * 413
+
+
+@pytest.fixture
+def write_mp3():
+    """Return a function that writes a small tagged MP3.
+
+    ``tags`` maps ID3 frame IDs to text, e.g. ``{"TIT2": "Title"}``.
+    """
+    from mutagen.id3 import ID3
+    from mutagen.id3._frames import Frames
+
+    def write(path, tags=None, frames=40, mtime=None):
+        id3 = ID3()
+        for frame_id, text in (tags or {}).items():
+            if frame_id == "COMM":
+                frame = Frames[frame_id](
+                    encoding=3, lang="eng", desc="comment", text=text
+                )
+            else:
+                frame = Frames[frame_id](encoding=3, text=text)
+            id3.add(frame)
+        header = io.BytesIO()
+        id3.save(header, padding=lambda info: 256)
+        with open(path, "wb") as f:
+            f.write(header.getvalue())
+            f.write(SILENT_FRAME * frames)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+        return str(path)
+
+    return write
+
+
+@pytest.fixture
+def wait_until():
+    """Return a function that polls ``condition`` until it is true."""
+
+    def wait(condition, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            assert time.monotonic() < deadline, "timed out waiting"
+            time.sleep(0.01)
+
+    return wait
+
+
+@pytest.fixture
+def configure(tmp_path, monkeypatch):
+    """Point ``recorder`` at a throwaway config in ``tmp_path``.
+
+    Returns a function that writes the config (defaults plus any overrides)
+    and calls ``recorder.configure()``. Logging setup is skipped so tests
+    don't leave handlers and listener threads behind.
+    """
+    import recorder
+
+    path = tmp_path / "config.json"
+    defaults = {
+        "base_dir": str(tmp_path),
+        "output_dir": str(tmp_path / "recordings"),
+        "log_file": str(tmp_path / "recorder.log"),
+        "status_file": str(tmp_path / "status.json"),
+        "catalog_file": str(tmp_path / "catalog.db"),
+        "shows": [],
+    }
+
+    def write(**overrides):
+        config = {**defaults, **overrides}
+        os.makedirs(config["output_dir"], exist_ok=True)
+        path.write_text(json.dumps(config))
+        monkeypatch.setattr(recorder.config_store, "_stat", None)
+        return config
+
+    def configure(**overrides):
+        write(**overrides)
+        monkeypatch.setattr(recorder, "config", None)
+        return recorder.configure()
+
+    monkeypatch.setattr(recorder.config_store, "path", str(path))
+    for name in ("config", "catalog", "lease_store"):
+        monkeypatch.setattr(recorder, name, None)
+    monkeypatch.setattr(recorder, "active_recordings", [])
+    monkeypatch.setattr(recorder, "active_occurrences", set())
+    monkeypatch.setattr(recorder, "setup_logging", lambda *args, **kwargs: None)
+    write()
+    configure.write = write
+    return configure
+
+
+@pytest.fixture
+def client(configure, monkeypatch):
+    """Flask test client; the app sets itself up from ``configure``'s config
+    on its first request."""
+    import app
+    from response_cache import ResponseCache
+
+    for name in ("catalog", "lease_store", "retag_manager"):
+        monkeypatch.setattr(app, name, None)
+    monkeypatch.setattr(app, "response_cache", ResponseCache())
+    monkeypatch.setattr(app, "feed_cache", ResponseCache())
+    return app.app.test_client()
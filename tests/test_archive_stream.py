@@ -0,0 +1,85 @@
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+import archive_stream
+from archive_stream import stream_tar, stream_zip
+
+
+@pytest.fixture
+def files(tmp_path, monkeypatch):
+    # Small chunks, so files span several of them
+    monkeypatch.setattr(archive_stream, "CHUNK_SIZE", 1000)
+    contents = {
+        "KEXP_20240101_200000.mp3": bytes(range(256)) * 20,
+        "WFMU_20240102_200000.mp3": b"x" * 3001,
+        "empty.mp3": b"",
+    }
+    paths = []
+    for name, data in contents.items():
+        (tmp_path / name).write_bytes(data)
+        paths.append((name, str(tmp_path / name)))
+    return paths, contents
+
+
+def test_zip_stream_is_a_valid_stored_archive(files):
+    paths, contents = files
+    chunks = list(stream_zip(paths))
+    assert max(len(chunk) for chunk in chunks) < 2000
+
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+        assert archive.testzip() is None
+        assert archive.namelist() == list(contents)
+        for name, data in contents.items():
+            assert archive.getinfo(name).compress_type == zipfile.ZIP_STORED
+            assert archive.read(name) == data
+
+
+def test_tar_stream_matches_its_announced_size(files):
+    paths, contents = files
+    size, chunks = stream_tar(paths)
+    data = b"".join(chunks)
+    assert len(data) == size
+
+    with tarfile.open(fileobj=io.BytesIO(data)) as archive:
+        assert archive.getnames() == list(contents)
+        for name, expected in contents.items():
+            assert archive.extractfile(name).read() == expected
+
+
+def test_tar_keeps_its_size_when_a_file_changes(files, tmp_path):
+    paths, contents = files
+    size, chunks = stream_tar(paths)
+    # One file grows and another shrinks after the size was announced
+    (tmp_path / "KEXP_20240101_200000.mp3").write_bytes(b"longer" * 2000)
+    (tmp_path / "WFMU_20240102_200000.mp3").write_bytes(b"short")
+    data = b"".join(chunks)
+    assert len(data) == size
+    with tarfile.open(fileobj=io.BytesIO(data)) as archive:
+        assert archive.extractfile("WFMU_20240102_200000.mp3").read()[:5] == b"short"
+
+
+def test_download_by_filter(client, configure, write_mp3):
+    config = configure()
+    write_mp3(f"{config['output_dir']}/KEXP_20240101_200000.mp3")
+    write_mp3(f"{config['output_dir']}/WFMU_20240101_200000.mp3")
+
+    response = client.get("/download_recordings?show=KEXP&format=tar")
+    assert response.status_code == 200
+    assert response.content_length == len(response.data)
+    with tarfile.open(fileobj=io.BytesIO(response.data)) as archive:
+        assert archive.getnames() == ["KEXP_20240101_200000.mp3"]
+
+    response = client.post(
+        "/download_recordings", data={"files": ["WFMU_20240101_200000.mp3"]}
+    )
+    with zipfile.ZipFile(io.BytesIO(response.data)) as archive:
+        assert archive.namelist() == ["WFMU_20240101_200000.mp3"]
+
+
+def test_download_rejects_bad_requests(client):
+    assert client.get("/download_recordings?show=KEXP&format=rar").status_code == 400
+    assert client.get("/download_recordings").status_code == 400
+    assert client.get("/download_recordings?show=Nobody").status_code == 404
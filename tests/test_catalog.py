@@ -0,0 +1,68 @@
+import os
+
+from catalog import Catalog, show_name_from_filename
+
+
+def make_catalog(tmp_path):
+    recordings = tmp_path / "recordings"
+    recordings.mkdir(exist_ok=True)
+    return Catalog(str(tmp_path / "catalog.db"), str(recordings))
+
+
+def test_show_name_from_filename():
+    assert show_name_from_filename("KEXP_20240101_200000.mp3") == "KEXP"
+    assert show_name_from_filename("Late_Night_20240101_200000.mp3") == "Late_Night"
+    assert show_name_from_filename("other.mp3") == "other"
+
+
+def test_refresh_indexes_tags_and_bumps_version(tmp_path, write_mp3):
+    catalog = make_catalog(tmp_path)
+    assert catalog.version() == 0
+
+    write_mp3(
+        tmp_path / "recordings" / "KEXP_20240101_200000.mp3",
+        {"TIT2": "Morning", "TPE1": "DJ", "COMM": "Live"},
+    )
+    catalog.refresh(force=True)
+    version = catalog.version()
+    assert version > 0
+
+    [recording] = catalog.list_recordings()
+    assert recording["show"] == "KEXP"
+    assert recording["tags"]["title"] == "Morning"
+    assert recording["tags"]["artist"] == "DJ"
+    assert recording["tags"]["comment"] == "Live"
+    assert recording["duration"] > 0
+
+    # Nothing changed on disk, so the version stays put
+    catalog.refresh(force=True)
+    assert catalog.version() == version
+
+
+def test_modified_and_removed_files_are_picked_up(tmp_path, write_mp3):
+    catalog = make_catalog(tmp_path)
+    path = write_mp3(
+        tmp_path / "recordings" / "KEXP_20240101_200000.mp3", {"TIT2": "Old"}
+    )
+    catalog.refresh(force=True)
+
+    write_mp3(path, {"TIT2": "New title"}, mtime=os.stat(path).st_mtime + 60)
+    catalog.refresh(force=True)
+    assert catalog.get("KEXP_20240101_200000.mp3")["tags"]["title"] == "New title"
+
+    version = catalog.version()
+    os.remove(path)
+    catalog.refresh(force=True)
+    assert catalog.list_recordings() == []
+    assert catalog.version() > version
+
+
+def test_update_rereads_a_single_file(tmp_path, write_mp3):
+    catalog = make_catalog(tmp_path)
+    write_mp3(tmp_path / "recordings" / "KEXP_20240101_200000.mp3", {"TIT2": "A"})
+    catalog.update("KEXP_20240101_200000.mp3")
+    assert catalog.count() == 1
+
+    os.remove(tmp_path / "recordings" / "KEXP_20240101_200000.mp3")
+    catalog.update("KEXP_20240101_200000.mp3")
+    assert catalog.get("KEXP_20240101_200000.mp3") is None
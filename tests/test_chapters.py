@@ -0,0 +1,204 @@
+import asyncio
+import io
+import logging
+import shutil
+import subprocess
+import threading
+
+import pytest
+
+import chapters
+from chapters import ChapterCollector, add_chapter_frames, read_chapter_frames
+
+
+# ffmpeg 7 stderr with "-loglevel level+verbose", recording from the
+# stand-in server in bench_load.py
+FFMPEG_STDERR = (
+    b"[tcp @ 0x3219f4c0] [verbose] Starting connection attempt to 127.0.0.1 port 8765\n"
+    b"[tcp @ 0x3219f4c0] [verbose] Successfully connected to 127.0.0.1 port 8765\n"
+    b"[mp3 @ 0x3219be00] [verbose] Skipping 0 bytes of junk at 0.\n"
+    b"[http @ 0x3219c640] [verbose] Metadata update for StreamTitle: abc - Track 1\n"
+    b"[info] Input #0, mp3, from 'http://127.0.0.1:8765/station/abc':\n"
+    b"[info]   Metadata:\n"
+    b"[info]     icy-name        : abc\n"
+    b"[info]     icy-br          : 128\n"
+    b"[info]     StreamTitle     : abc - Track 1\n"
+    b"[info]   Duration: N/A, start: 0.000000, bitrate: 128 kb/s\n"
+    b"[info]   Stream #0:0: Audio: mp3 (mp3float), 44100 Hz, stereo, fltp, 128 kb/s\n"
+    b"[out#0/mp3 @ 0x321aaec0] [verbose] No explicit maps, mapping streams "
+    b"automatically...\n"
+    b"[info] Stream mapping:\n"
+    b"[info]   Stream #0:0 -> #0:0 (mp3 (mp3float) -> mp3 (libmp3lame))\n"
+    b"[aist#0:0/mp3 @ 0x321bb400] [dec:mp3float @ 0x321bdb80] [verbose] Starting "
+    b"thread...\n"
+    b"[info] Output #0, mp3, to '/tmp/out.mp3':\n"
+    b"[info]   Metadata:\n"
+    b"[info]     StreamTitle     : abc - Track 1\n"
+    b"[info] size=      26KiB time=00:00:01.67 bitrate= 129.5kbits/s speed=3.34x\r"
+    b"[http @ 0x3219c640] [verbose] Metadata update for StreamTitle: abc - Track 2\n"
+    b"[info] size=      50KiB time=00:00:03.16 bitrate= 128.8kbits/s speed=1.58x\r"
+    b"[http @ 0x3219c640] [verbose] Metadata update for StreamTitle: abc - Track 3\n"
+    b"[out#0/mp3 @ 0x321aaec0] [info] video:0KiB audio:126KiB subtitle:0KiB other "
+    b"streams:0KiB global headers:0KiB muxing overhead: 0.260233%\n"
+    b"[info] size=     126KiB time=00:00:08.00 bitrate= 129.1kbits/s speed=1.17x\n"
+    b"[AVIOContext @ 0x321afac0] [verbose] Statistics: 131992 bytes read, 0 seeks\n"
+)
+
+FAILED_STDERR = (
+    b"[tcp @ 0xff074c0] [verbose] Connection attempt to 127.0.0.1 port 8799 "
+    b"failed: Connection refused\n"
+    b"[tcp @ 0xff074c0] [error] Connection to tcp://127.0.0.1:8799 failed: "
+    b"Connection refused\n"
+    b"[in#0 @ 0xff03ac0] [error] Error opening input: Connection refused\n"
+    b"[error] Error opening input file http://127.0.0.1:8799/x.\n"
+    b"[fatal] Error opening input files: Connection refused\n"
+)
+
+
+class Limiter:
+    def __init__(self):
+        self.logged = []
+
+    def log(self, level, message):
+        self.logged.append((level, message))
+
+
+def test_titles_from_real_ffmpeg_output():
+    collector = ChapterCollector()
+    collector.consume(io.BytesIO(FFMPEG_STDERR))
+
+    assert collector.finalize(8.0) == [
+        {"start": 0.0, "end": 1.67, "title": "abc - Track 1"},
+        {"start": 1.67, "end": 3.16, "title": "abc - Track 2"},
+        {"start": 3.16, "end": 8.0, "title": "abc - Track 3"},
+    ]
+    assert collector.opened_at is not None
+    # Verbose chatter stays out of the tail kept for error reports
+    assert "verbose] Starting" not in collector.stderr_tail()
+    assert "Statistics" not in collector.stderr_tail()
+    assert "Input #0" in collector.stderr_tail()
+
+
+def test_connection_timings_from_ffmpeg_output(monkeypatch):
+    clock = iter(range(100))
+    monkeypatch.setattr(chapters.time, "monotonic", lambda: next(clock))
+    collector = ChapterCollector()
+    collector.feed_line("[info] ffmpeg version 7.0.2-static")
+    collector.consume(io.BytesIO(FFMPEG_STDERR))
+
+    # One tick per line: the banner, the two tcp lines, then the demuxer's
+    assert collector.events == {
+        "started": 0, "connecting": 1, "connected": 2, "first_data": 3,
+    }
+    assert collector.network_error is None
+
+    collector = ChapterCollector()
+    collector.consume(io.BytesIO(FAILED_STDERR))
+    assert "connected" not in collector.events
+    assert collector.network_error == (
+        "Connection to tcp://127.0.0.1:8799 failed: Connection refused"
+    )
+
+
+def test_title_from_the_input_metadata_only():
+    # Without a Metadata update line, the title playing when we connected is
+    # only in the input's metadata dump
+    collector = ChapterCollector()
+    for line in FFMPEG_STDERR.decode().splitlines():
+        if "Metadata update" not in line:
+            collector.feed_line(line)
+    assert collector.chapters == [(0.0, "abc - Track 1")]
+
+
+def test_failure_reason_and_problem_levels():
+    limiter = Limiter()
+    collector = ChapterCollector(limiter=limiter)
+    collector.consume(io.BytesIO(FAILED_STDERR))
+
+    assert collector.failure_reason() == (
+        "[fatal] Error opening input files: Connection refused"
+    )
+    assert [level for level, _ in limiter.logged] == [logging.ERROR] * 4
+    assert collector.chapters == []
+    assert collector.opened_at is None
+
+
+def test_chapters_past_the_end_are_dropped():
+    collector = ChapterCollector()
+    collector.chapters = [(0.0, "One"), (5.0, "Two"), (12.0, "Three")]
+    assert collector.finalize(10.0) == [
+        {"start": 0.0, "end": 5.0, "title": "One"},
+        {"start": 5.0, "end": 10.0, "title": "Two"},
+    ]
+
+
+def test_chapter_frames_round_trip():
+    from mutagen.id3 import ID3
+
+    chapter_list = [
+        {"start": 0.0, "end": 1.5, "title": "One"},
+        {"start": 1.5, "end": 4.0, "title": "Two"},
+    ]
+    tags = ID3()
+    add_chapter_frames(tags, chapter_list)
+    assert read_chapter_frames(tags) == chapter_list
+
+
+@pytest.fixture
+def stand_in_server():
+    """bench_load's stand-in station, with a new title every 1.5 seconds."""
+    from bench_load import StandInServer
+
+    loop = asyncio.new_event_loop()
+    server = StandInServer(title_every=1.5)
+    listener = loop.run_until_complete(
+        asyncio.start_server(server.handle, "127.0.0.1", 0)
+    )
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield listener.sockets[0].getsockname()[1]
+
+    async def shutdown():
+        listener.close()
+        tasks = asyncio.all_tasks() - {asyncio.current_task()}
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run_coroutine_threadsafe(shutdown(), loop).result(timeout=5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="needs ffmpeg")
+def test_chapters_from_a_live_capture(stand_in_server, tmp_path):
+    url = f"http://127.0.0.1:{stand_in_server}/station/abc"
+    process = subprocess.Popen(
+        ["ffmpeg", "-loglevel", "level+verbose", "-i", url, "-t", "4"]
+        + ["-acodec", "libmp3lame", str(tmp_path / "out.mp3")],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    collector = ChapterCollector()
+    collector.consume(process.stderr)
+    assert process.wait(timeout=30) == 0
+
+    found = collector.finalize(4.0)
+    assert found[0]["start"] == 0.0
+    assert [c["title"] for c in found[:2]] == ["abc - Track 1", "abc - Track 2"]
+    assert 1 < found[1]["start"] < 4
+    events = collector.events
+    assert events["started"] <= events["connecting"] <= events["connected"]
+    assert events["connected"] < events["first_data"] <= collector.opened_at
+
+
+def test_output_size_follows_progress_lines():
+    collector = ChapterCollector()
+    collector.consume(io.BytesIO(FFMPEG_STDERR))
+    assert collector.output_bytes == 126 * 1024
+
+    # Older ffmpeg reports kB, and N/A before anything is written
+    collector.feed_line("size=N/A time=00:00:00.00 bitrate=N/A speed=N/A")
+    collector.feed_line("size=    2048kB time=00:02:11.00 bitrate= 128.0kbits/s")
+    assert collector.output_bytes == 2048 * 1024
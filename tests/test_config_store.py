@@ -0,0 +1,155 @@
+import json
+import logging
+import os
+
+import pytest
+
+import config_store
+from config_store import ConfigError, ConfigStore, StaleConfigError
+
+
+def write_config(path, shows):
+    path.write_text(json.dumps({"shows": shows}))
+    return ConfigStore(str(path))
+
+
+SHOWS = [
+    {"name": "KEXP", "day": "Monday", "time": "08:00 PM"},
+    {"name": "WFMU", "day": "Friday", "time": "06:00 PM"},
+]
+
+
+def test_load_assigns_stable_ids_and_saves_them(tmp_path):
+    store = write_config(tmp_path / "config.json", SHOWS)
+    config = store.load()
+    ids = [show["id"] for show in config["shows"]]
+    assert len(set(ids)) == 2
+
+    saved = json.loads((tmp_path / "config.json").read_text())
+    assert [show["id"] for show in saved["shows"]] == ids
+    # A second process reading the same legacy file agrees on the IDs
+    other = write_config(tmp_path / "other.json", SHOWS)
+    assert [show["id"] for show in other.load()["shows"]] == ids
+
+
+def test_duplicate_ids_are_replaced(tmp_path):
+    shows = [dict(show, id="same") for show in SHOWS]
+    store = write_config(tmp_path / "config.json", shows)
+    ids = [show["id"] for show in store.load()["shows"]]
+    assert ids[0] == "same"
+    assert ids[1] != "same"
+
+
+def test_load_returns_copies_and_picks_up_external_edits(tmp_path):
+    path = tmp_path / "config.json"
+    store = write_config(path, SHOWS)
+    config = store.load()
+    config["shows"].clear()
+    assert len(store.load()["shows"]) == 2
+
+    edited = json.loads(path.read_text())
+    edited["shows"].pop()
+    path.write_text(json.dumps(edited, indent=4))
+    assert [show["name"] for show in store.load()["shows"]] == ["KEXP"]
+
+
+def test_save_rejects_edits_from_an_old_version(tmp_path):
+    store = write_config(tmp_path / "config.json", SHOWS)
+    config, version = store.snapshot()
+
+    config["shows"][0]["name"] = "KEXP Live"
+    new_version = store.save(config, version)
+    assert new_version != version
+    assert store.load()["shows"][0]["name"] == "KEXP Live"
+
+    # A second tab still holding the first version
+    config["shows"][0]["name"] = "Stale"
+    with pytest.raises(StaleConfigError):
+        store.save(config, version)
+    assert store.load()["shows"][0]["name"] == "KEXP Live"
+
+
+def test_save_without_version_overwrites(tmp_path):
+    store = write_config(tmp_path / "config.json", SHOWS)
+    store.save({"shows": []})
+    assert store.load() == {"shows": []}
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_read_only_config_keeps_ids_in_memory(tmp_path, monkeypatch, caplog):
+    path = tmp_path / "config.json"
+    store = write_config(path, SHOWS)
+    original = path.read_text()
+
+    def denied(*args, **kwargs):
+        raise PermissionError(13, "Permission denied")
+
+    monkeypatch.setattr(config_store.tempfile, "mkstemp", denied)
+    with caplog.at_level(logging.WARNING):
+        config = store.load()
+
+    assert all(show["id"] for show in config["shows"])
+    assert path.read_text() == original
+    assert "Could not save show IDs" in caplog.text
+    # The IDs stay the same on later loads
+    assert store.load() == config
+
+
+def test_missing_or_invalid_config_raises_config_error(tmp_path):
+    store = ConfigStore(str(tmp_path / "config.json"))
+    with pytest.raises(ConfigError, match="not found"):
+        store.load()
+
+    (tmp_path / "config.json").write_text("{not json")
+    with pytest.raises(ConfigError, match="Invalid JSON"):
+        store.snapshot()
+
+
+def test_web_app_reports_a_broken_config(client, configure):
+    import app
+
+    with open(app.config_store.path, "w") as f:
+        f.write("{not json")
+    response = client.get("/")
+    assert response.status_code == 500
+    assert b"Invalid JSON" in response.data
+
+    # Once the file is fixed the app sets itself up as usual
+    configure.write()
+    assert client.get("/export_recordings").status_code == 200
+
+
+def test_recorder_exits_on_a_missing_config(tmp_path):
+    import subprocess
+    import sys
+
+    recorder = os.path.join(os.path.dirname(os.path.dirname(__file__)), "recorder.py")
+    result = subprocess.run(
+        [sys.executable, recorder],
+        env={**os.environ, "RADIOJOE_CONFIG_FILE": str(tmp_path / "missing.json")},
+        capture_output=True,
+        text=True,
+        timeout=30,
+    )
+    assert result.returncode == 1
+    assert "Configuration file not found" in result.stdout
+
+
+def test_retention_worker_survives_a_broken_config(monkeypatch, caplog):
+    import retention
+    from retention import RetentionWorker
+
+    def load_config():
+        raise ConfigError("Invalid JSON in configuration file at config.json")
+
+    class Stop(Exception):
+        pass
+
+    def sleep(seconds):
+        raise Stop
+
+    monkeypatch.setattr(retention.time, "sleep", sleep)
+    worker = RetentionWorker(catalog=None, load_config=load_config)
+    with caplog.at_level(logging.ERROR), pytest.raises(Stop):
+        worker.run_forever()
+    assert "Invalid JSON" in caplog.text
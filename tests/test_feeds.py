@@ -0,0 +1,70 @@
+import os
+import xml.etree.ElementTree as ET
+
+import pytest
+
+
+@pytest.fixture
+def recordings(configure, write_mp3):
+    config = configure(shows=[{"name": "KEXP", "url": "http://127.0.0.1:9/live"}])
+    paths = [
+        write_mp3(
+            f"{config['output_dir']}/KEXP_202401{day}_200000.mp3",
+            {"TIT2": f"Show {day}"},
+            mtime=1_704_000_000 + int(day) * 86400,
+        )
+        for day in ("01", "02")
+    ]
+    return paths
+
+
+def refresh():
+    import app
+
+    app.catalog.refresh(force=True)
+
+
+def test_feed_lists_recordings_newest_first(client, recordings):
+    response = client.get("/feeds/KEXP.xml")
+    assert response.status_code == 200
+    assert response.mimetype == "application/rss+xml"
+
+    channel = ET.fromstring(response.data).find("channel")
+    items = channel.findall("item")
+    assert [item.findtext("title") for item in items] == ["Show 02", "Show 01"]
+    enclosure = items[0].find("enclosure")
+    assert enclosure.get("url").endswith("/recordings/KEXP_20240102_200000.mp3")
+    assert int(enclosure.get("length")) == os.path.getsize(recordings[1])
+
+
+def test_unknown_show_is_404(client):
+    assert client.get("/feeds/Nobody.xml").status_code == 404
+
+
+def test_feeds_do_not_evict_pages(client, recordings):
+    import app
+
+    client.get("/export_recordings")
+    for i in range(app.response_cache.max_entries + 1):
+        client.get("/feeds/KEXP.xml", base_url=f"http://host{i}.example/")
+    assert "export_recordings" in app.response_cache._entries
+
+
+def test_last_modified_never_goes_backwards(client, recordings):
+    first = client.get("/feeds/KEXP.xml")
+    since = first.headers["Last-Modified"]
+    assert client.get(
+        "/feeds/KEXP.xml", headers={"If-Modified-Since": since}
+    ).status_code == 304
+
+    # Deleting the newest recording leaves an older newest mtime, but the
+    # feed still changed
+    os.remove(recordings[1])
+    refresh()
+    response = client.get("/feeds/KEXP.xml", headers={"If-Modified-Since": since})
+    assert response.status_code == 200
+    assert response.last_modified > first.last_modified
+    assert [
+        item.findtext("title")
+        for item in ET.fromstring(response.data).find("channel").findall("item")
+    ] == ["Show 01"]
@@ -0,0 +1,193 @@
+import time
+
+import pytest
+
+import leases
+from leases import LeaseStore, MAX_ATTEMPTS
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(leases, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def stores(tmp_path, clock):
+    path = str(tmp_path / "leases.db")
+    return LeaseStore(path, "node-a", ttl=60), LeaseStore(path, "node-b", ttl=60)
+
+
+JOB = {"show": {"name": "KEXP"}, "metadata": {}}
+
+
+def claim(store, clock, occurrence="kexp@2024-01-01T20:00Z"):
+    return store.claim(occurrence, JOB, clock.now, clock.now + 3600)
+
+
+def test_only_the_first_node_gets_the_claim(stores, clock):
+    node_a, node_b = stores
+    assert claim(node_a, clock)
+    assert not claim(node_b, clock)
+    # Claiming again is harmless for the owner
+    assert claim(node_a, clock)
+
+
+def test_renewed_leases_are_not_orphaned(stores, clock):
+    node_a, node_b = stores
+    claim(node_a, clock)
+    clock.now += 50
+    node_a.renew(["kexp@2024-01-01T20:00Z"], active=1)
+    clock.now += 50
+    assert node_b.orphans() == []
+    assert not claim(node_b, clock)
+
+
+def test_expired_lease_is_taken_over(stores, clock):
+    node_a, node_b = stores
+    claim(node_a, clock)
+    clock.now += 61
+
+    [orphan] = node_b.orphans()
+    assert orphan["occurrence"] == "kexp@2024-01-01T20:00Z"
+    assert orphan["previous_node"] == "node-a"
+    assert orphan["job"] == JOB
+    assert node_b.claim(
+        orphan["occurrence"], orphan["job"], orphan["starts_at"], orphan["ends_at"]
+    )
+    # The old owner can't renew a lease it lost, or claim it back
+    node_a.renew(["kexp@2024-01-01T20:00Z"])
+    assert not claim(node_a, clock)
+
+
+def test_completed_occurrences_are_never_reclaimed(stores, clock):
+    node_a, node_b = stores
+    claim(node_a, clock)
+    node_a.complete("kexp@2024-01-01T20:00Z", "KEXP_20240101_200000.mp3")
+    clock.now += 120
+    assert node_b.orphans() == []
+    assert not claim(node_b, clock)
+
+
+def test_failed_occurrence_is_offered_to_other_nodes(stores, clock):
+    node_a, node_b = stores
+    claim(node_a, clock)
+    node_a.fail("kexp@2024-01-01T20:00Z")
+    clock.now += 1
+    assert [o["occurrence"] for o in node_b.orphans()] == ["kexp@2024-01-01T20:00Z"]
+
+
+def test_no_orphans_near_the_end_of_the_show(stores, clock):
+    node_a, node_b = stores
+    node_a.claim("kexp@2024-01-01T20:00Z", JOB, clock.now, clock.now + 80)
+    clock.now += 61
+    assert node_b.orphans(min_remaining=30) == []
+
+
+def test_takeovers_stop_after_max_attempts(tmp_path, clock):
+    path = str(tmp_path / "leases.db")
+    nodes = [LeaseStore(path, f"node-{i}", ttl=60) for i in range(MAX_ATTEMPTS + 1)]
+    assert claim(nodes[0], clock)
+    for node in nodes[1:MAX_ATTEMPTS]:
+        clock.now += 61
+        assert claim(node, clock)
+    clock.now += 61
+    assert nodes[-1].orphans() == []
+    assert not claim(nodes[-1], clock)
+
+
+def test_nodes_lists_recent_heartbeats(stores, clock):
+    node_a, node_b = stores
+    node_a.renew([], active=2)
+    clock.now += 200
+    node_b.renew([], active=0)
+    assert [n["node"] for n in node_b.nodes()] == ["node-b"]
+    assert [n["node"] for n in node_b.nodes(max_age=300)] == ["node-a", "node-b"]
+
+
+def test_retention_leases_are_not_orphans(stores, clock):
+    node_a, node_b = stores
+    node_a.claim("retention@999600", {"kind": "retention"}, 999600, 1003200)
+    claim(node_a, clock)
+    clock.now += 61
+    assert [o["occurrence"] for o in node_b.orphans()] == ["kexp@2024-01-01T20:00Z"]
+
+
+@pytest.fixture
+def shared_recorder(configure, tmp_path, monkeypatch):
+    """``recorder`` configured as node-b, sharing leases with ``node_a``."""
+    import recorder
+
+    monkeypatch.delenv("RADIOJOE_NODE", raising=False)
+    configure(lease_file=str(tmp_path / "leases.db"), node_name="node-b")
+    monkeypatch.setattr(recorder, "held_leases", set())
+    started = []
+    monkeypatch.setattr(
+        recorder, "record_stream", lambda *args, **kwargs: started.append(args)
+    )
+    node_a = LeaseStore(str(tmp_path / "leases.db"), "node-a", ttl=60)
+    return recorder, node_a, started
+
+
+def test_retention_lease_is_completed_after_the_pass(shared_recorder):
+    recorder, node_a, _ = shared_recorder
+    turn = recorder.retention_turn(3600)
+    assert turn.startswith("retention@")
+    # Another node doesn't prune in the same interval
+    assert not node_a.claim(turn, {"kind": "retention"}, 0, 0)
+
+    recorder.retention_done(turn)
+    [row] = node_a._connect().execute(
+        "SELECT status FROM leases WHERE occurrence = ?", (turn,)
+    )
+    assert row["status"] == "done"
+
+
+def test_a_bad_orphan_does_not_stop_takeovers(shared_recorder, monkeypatch):
+    recorder, node_a, started = shared_recorder
+    now = time.time()
+    # A lease from an older version whose job can't be recorded, then a
+    # show, both left behind by a node that died
+    node_a.claim("retention@1", {}, now, now + 3600)
+    node_a.claim(
+        "kexp@now",
+        {
+            "kind": "recording",
+            "show": {"name": "KEXP", "url": "http://127.0.0.1:9/live"},
+            "metadata": {},
+        },
+        now,
+        now + 3600,
+    )
+    monkeypatch.setattr(leases, "time", Clock(now + 61))
+
+    recorder.take_over_orphans()
+
+    [args] = started
+    assert args[0] == "KEXP"
+    assert 3500 < args[2] <= 3600
+    assert recorder.held_leases == {"kexp@now"}
+
+
+def test_retention_lease_is_renewed_until_the_pass_is_done(shared_recorder, clock):
+    recorder, node_a, _ = shared_recorder
+    turn = recorder.retention_turn(3600)
+    assert turn in recorder.held_leases
+
+    # A long archiving pass outlasts the TTL; renewals keep the lease
+    for _ in range(3):
+        clock.now += 50
+        recorder.lease_store.renew(list(recorder.held_leases))
+    assert not node_a.claim(turn, {"kind": "retention"}, 0, 0)
+
+    recorder.retention_done(turn)
+    assert turn not in recorder.held_leases
@@ -0,0 +1,99 @@
+import json
+import logging
+import threading
+
+import pytest
+
+import recorder
+from logs import ContextFilter, JsonFormatter, RepeatLimiter, set_log_context
+
+
+@pytest.fixture
+def log_files(monkeypatch):
+    files = []
+    monkeypatch.setattr(
+        recorder, "setup_logging", lambda log_file, **kwargs: files.append(log_file)
+    )
+    monkeypatch.delenv("RADIOJOE_NODE", raising=False)
+    return files
+
+
+def test_recorder_and_web_log_to_separate_files(configure, log_files, tmp_path):
+    configure()
+    recorder.config = None
+    recorder.configure(process="web")
+    assert log_files == [
+        str(tmp_path / "recorder.log"),
+        str(tmp_path / "recorder-web.log"),
+    ]
+
+
+def test_each_node_has_its_own_log_file(configure, log_files, tmp_path):
+    configure(lease_file=str(tmp_path / "leases.db"), node_name="node-a")
+    assert log_files == [str(tmp_path / "recorder-node-a.log")]
+
+
+class Recorded(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append((record.levelno, record.getMessage()))
+
+
+@pytest.fixture
+def limiter_logger():
+    logger = logging.getLogger("test_logs.limiter")
+    logger.propagate = False
+    handler = Recorded()
+    logger.addHandler(handler)
+    yield logger, handler.messages
+    logger.removeHandler(handler)
+
+
+def test_repeats_are_counted_and_flushed(limiter_logger):
+    logger, messages = limiter_logger
+    limiter = RepeatLimiter(logger)
+    for address in ("0x1f", "0x2e", "0x3d"):
+        limiter.log(logging.WARNING, f"[mp3 @ {address}] Header missing")
+    limiter.log(logging.ERROR, "Connection reset")
+    assert messages == [
+        (logging.WARNING, "[mp3 @ 0x1f] Header missing"),
+        (logging.ERROR, "Connection reset"),
+    ]
+
+    limiter.flush()
+    assert messages[-1] == (
+        logging.WARNING,
+        "[mp3 @ 0x3d] Header missing (repeated 2 more times)",
+    )
+
+
+def test_repeat_after_the_interval_reports_the_count(limiter_logger):
+    logger, messages = limiter_logger
+    limiter = RepeatLimiter(logger, interval=0)
+    limiter.log(logging.WARNING, "Header missing")
+    limiter.log(logging.WARNING, "Header missing")
+    assert len(messages) == 2
+
+
+def test_json_records_carry_the_thread_context():
+    record = logging.LogRecord("root", logging.INFO, __file__, 1, "hello", (), None)
+
+    def in_recording_thread():
+        set_log_context(show="KEXP", show_id="kexp", recording="KEXP_1.mp3")
+        ContextFilter("recorder").filter(record)
+
+    thread = threading.Thread(target=in_recording_thread, name="recording")
+    thread.start()
+    thread.join()
+
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["process"] == "recorder"
+    assert entry["message"] == "hello"
+    assert (entry["show"], entry["show_id"], entry["recording"]) == (
+        "KEXP",
+        "kexp",
+        "KEXP_1.mp3",
+    )
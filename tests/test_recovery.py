@@ -0,0 +1,124 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+import pytz
+
+import recorder
+
+
+def on_air_show(minutes_ago=10, duration=3600):
+    tz = pytz.timezone("America/New_York")
+    starts = datetime.now(tz) - timedelta(minutes=minutes_ago)
+    return {
+        "id": "kexp",
+        "name": "KEXP",
+        "url": "http://127.0.0.1:9/live",
+        "day": recorder.DAYS[starts.weekday()],
+        "time": starts.strftime("%I:%M %p"),
+        "timezone": "America/New_York",
+        "duration": duration,
+    }
+
+
+@pytest.fixture
+def ffmpeg(monkeypatch, wait_until):
+    """Stand-in for ffmpeg that runs until ``release`` is set."""
+
+    class FakeFfmpeg:
+        commands = []
+        release = threading.Event()
+
+        def __call__(self, command, **kwargs):
+            self.commands.append(command)
+            self.release.wait(5)
+            raise OSError("ffmpeg is not run in tests")
+
+    fake = FakeFfmpeg()
+    monkeypatch.setattr(recorder.subprocess, "Popen", fake)
+    yield fake
+    fake.release.set()
+    wait_until(lambda: not recorder.active_recordings)
+
+
+def test_concurrent_recoveries_record_once(configure, ffmpeg, wait_until):
+    config = configure(shows=[on_air_show()])
+    threads = [
+        threading.Thread(target=recorder.recover_missed_windows, args=(config,))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    wait_until(lambda: ffmpeg.commands)
+    assert recorder.active_recordings == ["KEXP"]
+    [occurrence] = recorder.active_occurrences
+    assert occurrence.startswith("kexp@")
+    assert len(ffmpeg.commands) == 1
+
+
+def test_scheduled_start_skips_a_recovered_occurrence(
+    configure, ffmpeg, wait_until, monkeypatch
+):
+    show = on_air_show()
+    config = configure(shows=[show])
+    recorder.recover_missed_windows(config)
+    wait_until(lambda: ffmpeg.commands)
+
+    # The scheduled job for the same occurrence fires (a few seconds late)
+    # while it is being recorded
+    starts_at = recorder.current_occurrence(show).timestamp()
+    clock = SimpleNamespace(
+        time=lambda: starts_at + 3, monotonic=time.monotonic, sleep=time.sleep
+    )
+    monkeypatch.setattr(recorder, "time", clock)
+    recorder.start_recording(show, recorder.OUTPUT_DIR, {})
+    assert recorder.active_recordings == ["KEXP"]
+    assert len(ffmpeg.commands) == 1
+
+
+def test_finished_occurrence_can_be_recorded_again(configure, ffmpeg, wait_until):
+    config = configure(shows=[on_air_show()])
+    recorder.recover_missed_windows(config)
+    wait_until(lambda: ffmpeg.commands)
+    ffmpeg.release.set()
+    wait_until(lambda: not recorder.active_occurrences)
+
+    recorder.recover_missed_windows(config)
+    wait_until(lambda: len(ffmpeg.commands) == 2)
+
+
+def test_shows_not_on_air_or_nearly_over_are_skipped(configure, ffmpeg):
+    config = configure(
+        shows=[
+            on_air_show(minutes_ago=-30),
+            dict(on_air_show(minutes_ago=10, duration=610), id="short", name="Short"),
+        ]
+    )
+    recorder.recover_missed_windows(config)
+    assert recorder.active_recordings == []
+    assert ffmpeg.commands == []
+
+
+def test_config_reload_reschedules_and_recovers(
+    configure, ffmpeg, wait_until, monkeypatch
+):
+    config = configure(shows=[on_air_show()])
+    monkeypatch.setattr(recorder, "load_config", lambda: config)
+    recorder.schedule.clear()
+    try:
+        # Returns once the schedule is rebuilt, rather than running it
+        recorder.reload_config()
+        assert len(recorder.schedule.get_jobs()) == 2
+        wait_until(lambda: ffmpeg.commands)
+
+        # A second reload leaves the recording in progress alone
+        recorder.reload_config()
+        assert len(recorder.schedule.get_jobs()) == 2
+        assert len(ffmpeg.commands) == 1
+    finally:
+        recorder.schedule.clear()
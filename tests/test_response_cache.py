@@ -0,0 +1,109 @@
+import gzip
+
+import pytest
+from flask import Flask
+
+from response_cache import ResponseCache, cached_response
+
+
+@pytest.fixture
+def flask_app():
+    return Flask(__name__)
+
+
+def test_get_reuses_body_until_version_changes():
+    cache = ResponseCache()
+    renders = []
+
+    def render():
+        renders.append(1)
+        return f"body {len(renders)}"
+
+    first = cache.get("page", 1, render)
+    assert cache.get("page", 1, render) is first
+    second = cache.get("page", 2, render)
+    assert second.body == b"body 2"
+    assert second.etag != first.etag
+    assert len(renders) == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.get("a", 1, lambda: "a")
+    cache.get("b", 1, lambda: "b")
+    cache.get("a", 1, lambda: "a")
+    cache.get("c", 1, lambda: "c")
+
+    rendered = []
+    cache.get("a", 1, lambda: rendered.append("a") or "a")
+    cache.get("b", 1, lambda: rendered.append("b") or "b")
+    assert rendered == ["b"]
+
+
+def test_large_bodies_are_gzipped(flask_app):
+    cache = ResponseCache()
+    body = "<p>recording</p>" * 100
+    with flask_app.test_request_context(headers={"Accept-Encoding": "gzip"}):
+        response = cached_response(cache, "page", 1, lambda: body)
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(response.get_data()) == body.encode()
+    assert response.headers["ETag"].endswith('-gzip"')
+    assert response.headers["Vary"] == "Accept-Encoding"
+
+
+def test_small_bodies_are_not_compressed(flask_app):
+    cache = ResponseCache()
+    with flask_app.test_request_context(headers={"Accept-Encoding": "gzip"}):
+        response = cached_response(cache, "page", 1, lambda: "small")
+    assert "Content-Encoding" not in response.headers
+    assert response.get_data() == b"small"
+
+
+def test_matching_etag_gets_304(flask_app):
+    cache = ResponseCache()
+    with flask_app.test_request_context():
+        etag = cached_response(cache, "page", 1, lambda: "body").headers["ETag"]
+    with flask_app.test_request_context(headers={"If-None-Match": etag}):
+        response = cached_response(cache, "page", 1, lambda: "body")
+    assert response.status_code == 304
+    assert response.get_data() == b""
+
+    # A new version with a different body no longer matches
+    with flask_app.test_request_context(headers={"If-None-Match": etag}):
+        response = cached_response(cache, "page", 2, lambda: "changed")
+    assert response.status_code == 200
+
+
+def test_export_is_cached_until_the_catalog_changes(client, configure, write_mp3):
+    config = configure()
+    response = client.get("/export_recordings")
+    assert response.get_json() == []
+    etag = response.headers["ETag"]
+    assert client.get(
+        "/export_recordings", headers={"If-None-Match": etag}
+    ).status_code == 304
+
+    write_mp3(f"{config['output_dir']}/KEXP_20240101_200000.mp3", {"TIT2": "New"})
+    import app
+
+    app.catalog.refresh(force=True)
+    response = client.get("/export_recordings", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert [r["title"] for r in response.get_json()] == ["New"]
+
+
+def test_modified_at_only_moves_forward(monkeypatch):
+    import response_cache
+
+    now = [1_000_000.5]
+    monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+    cache = ResponseCache()
+    first = cache.get("feed", 1, lambda: "one")
+    assert first.modified_at == 1_000_000
+
+    # Same body under a new version: unchanged
+    now[0] += 60
+    assert cache.get("feed", 2, lambda: "one").modified_at == 1_000_000
+    # A change in the same second as the last one still moves it on
+    now[0] = 1_000_000.9
+    assert cache.get("feed", 3, lambda: "two").modified_at == 1_000_001
@@ -0,0 +1,140 @@
+import os
+
+import pytest
+
+from catalog import get_mp3_tags
+from retag import check_filter, matches, write_tags
+
+
+RECORDING = {
+    "show": "KEXP",
+    "date": "2024-01-15 20:00:00",
+    "tags": {"artist": "Old Name", "genre": "Radio"},
+}
+
+
+def test_write_tags_updates_in_place(tmp_path, write_mp3):
+    path = write_mp3(tmp_path / "KEXP_20240101_200000.mp3", {"TIT2": "Old"})
+    size = os.path.getsize(path)
+
+    write_tags(path, {"title": "New title", "artist": "DJ", "comment": "Hi"})
+    tags = get_mp3_tags(path)
+    assert (tags["title"], tags["artist"], tags["comment"]) == ("New title", "DJ", "Hi")
+    # The new tag fit in the existing padding, so the audio didn't move
+    assert os.path.getsize(path) == size
+
+
+def test_write_tags_only_replaces_our_comment(tmp_path, write_mp3):
+    from mutagen.id3 import ID3
+    from mutagen.id3._frames import COMM
+
+    path = write_mp3(tmp_path / "KEXP_20240101_200000.mp3")
+    tags = ID3(path)
+    tags.add(COMM(encoding=3, lang="eng", desc="encoder", text="LAME"))
+    tags.save(path)
+
+    write_tags(path, {"comment": "first"})
+    write_tags(path, {"comment": "second"})
+    comments = {frame.desc: str(frame) for frame in ID3(path).getall("COMM")}
+    assert comments == {"encoder": "LAME", "comment": "second"}
+
+
+@pytest.mark.parametrize(
+    "filters, expected",
+    [
+        ({}, True),
+        ({"show": "KEXP"}, True),
+        ({"show": "WFMU"}, False),
+        ({"date_from": "2024-01-15", "date_to": "2024-01-15"}, True),
+        ({"date_from": "2024-01-16"}, False),
+        ({"date_to": "2024-01-14"}, False),
+        ({"tags": {"artist": "Old Name"}}, True),
+        ({"tags": {"artist": "Other", "genre": "Radio"}}, False),
+    ],
+)
+def test_matches(filters, expected):
+    assert matches(RECORDING, filters) is expected
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [
+        ["KEXP"],
+        {"tags": "artist"},
+        {"tags": ["artist"]},
+        {"tags": None},
+        {"tags": {"artist": 5}},
+        {"tags": {"mood": "calm"}},
+        {"show": 7},
+        {"date-from": "2024-01-01"},
+    ],
+)
+def test_check_filter_rejects_bad_shapes(filters):
+    with pytest.raises(ValueError):
+        check_filter(filters)
+
+
+def test_bulk_retag(client, configure, write_mp3, wait_until):
+    config = configure()
+    for day in ("01", "02"):
+        write_mp3(
+            f"{config['output_dir']}/KEXP_202401{day}_200000.mp3", {"TPE1": "Old"}
+        )
+    write_mp3(f"{config['output_dir']}/WFMU_20240101_200000.mp3", {"TPE1": "Old"})
+
+    response = client.post(
+        "/retag",
+        json={"filter": {"show": "KEXP"}, "changes": {"artist": "New"}},
+    )
+    assert response.status_code == 202
+    progress = response.headers["Location"]
+    wait_until(lambda: client.get(progress).get_json()["status"] == "finished")
+    job = client.get(progress).get_json()
+    assert (job["total"], job["done"], job["failed"]) == (2, 2, [])
+
+    import app
+
+    artists = {
+        r["filename"]: r["tags"]["artist"] for r in app.catalog.list_recordings()
+    }
+    assert artists == {
+        "KEXP_20240101_200000.mp3": "New",
+        "KEXP_20240102_200000.mp3": "New",
+        "WFMU_20240101_200000.mp3": "Old",
+    }
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        {"filter": {"tags": "Old Name"}, "changes": {"artist": "New"}},
+        {"filter": {"tags": None}, "changes": {"artist": "New"}},
+        {"filter": ["KEXP"], "changes": {"artist": "New"}},
+        {"filter": {}, "changes": {"mood": "calm"}},
+        {"filter": {}, "changes": ["artist"]},
+        {"filter": {}},
+        ["not", "an", "object"],
+    ],
+)
+def test_bad_retag_requests_get_400(client, body):
+    response = client.post("/retag", json=body)
+    assert response.status_code == 400
+    assert response.get_json()["success"] is False
+
+
+def test_unknown_retag_job_is_404(client):
+    assert client.get("/retag/nope").status_code == 404
+
+
+def test_edited_comment_is_read_back_over_other_comments(tmp_path, write_mp3):
+    from mutagen.id3 import ID3
+    from mutagen.id3._frames import COMM
+
+    path = write_mp3(tmp_path / "KEXP_20240101_200000.mp3")
+    tags = ID3(path)
+    tags.add(COMM(encoding=3, lang="eng", desc="", text="old"))
+    tags.save(path)
+    assert get_mp3_tags(path)["comment"] == "old"
+
+    write_tags(path, {"comment": "hello"})
+    assert get_mp3_tags(path)["comment"] == "hello"
@@ -0,0 +1,150 @@
+import os
+import time
+
+from retention import GRACE_SECONDS, RetentionWorker, plan_retention
+from chapters import sidecar_path
+
+DAY = 86400
+NOW = 1_700_000_000
+
+
+def recording(show, age_days, size=10 * 2**20, bitrate=128000):
+    return {
+        "filename": f"{show}_{age_days}.mp3",
+        "show": show,
+        "mtime": NOW - age_days * DAY,
+        "size": size,
+        "bitrate": bitrate,
+    }
+
+
+def names(items):
+    return sorted(
+        (item[0] if isinstance(item, tuple) else item)["filename"] for item in items
+    )
+
+
+def test_keep_latest_per_show_with_overrides():
+    recordings = [recording("KEXP", age) for age in (1, 2, 3)] + [
+        recording("WFMU", age) for age in (1, 2, 3)
+    ]
+    config = {
+        "retention": {"keep_latest": 2},
+        "shows": [{"name": "WFMU", "retention": {"keep_latest": 1}}],
+    }
+    deletions, archives = plan_retention(recordings, config, now=NOW)
+    assert names(deletions) == ["KEXP_3.mp3", "WFMU_2.mp3", "WFMU_3.mp3"]
+    assert archives == []
+
+
+def test_max_age_and_archiving():
+    recordings = [
+        recording("KEXP", 1),
+        recording("KEXP", 20),
+        recording("KEXP", 21, bitrate=48000),
+        recording("KEXP", 100),
+    ]
+    config = {"retention": {"max_age_days": 90, "archive_after_days": 14}}
+    deletions, archives = plan_retention(recordings, config, now=NOW)
+    assert names(deletions) == ["KEXP_100.mp3"]
+    # The 48k recording is already at the archive bitrate
+    assert names(archives) == ["KEXP_20.mp3"]
+
+
+def test_disk_budget_deletes_oldest_down_to_low_water():
+    recordings = [recording("KEXP", age, size=2**30) for age in range(1, 11)]
+    config = {
+        "retention": {
+            "disk_budget_gb": 10,
+            "high_water_percent": 90,
+            "low_water_percent": 70,
+        }
+    }
+    deletions, _ = plan_retention(recordings, config, now=NOW)
+    assert names(deletions) == ["KEXP_10.mp3", "KEXP_8.mp3", "KEXP_9.mp3"]
+    assert {reason for _, reason in deletions} == {"over the disk budget"}
+
+
+def test_recent_recordings_are_never_touched():
+    fresh = dict(recording("KEXP", 0), mtime=NOW - GRACE_SECONDS + 60)
+    deletions, _ = plan_retention(
+        [fresh, recording("KEXP", 1)],
+        {"retention": {"keep_latest": 1}},
+        now=NOW,
+    )
+    assert names(deletions) == []
+
+
+class FakeCatalog:
+    def __init__(self, recordings_dir, recordings):
+        self.recordings_dir = recordings_dir
+        self.recordings = recordings
+        self.removed = []
+
+    def list_recordings(self, refresh=True):
+        return self.recordings
+
+    def remove(self, filename):
+        self.removed.append(filename)
+
+
+def test_worker_deletes_recordings_with_their_sidecars(tmp_path):
+    path = tmp_path / "KEXP_20240101_200000.mp3"
+    path.write_bytes(b"audio")
+    with open(sidecar_path(str(path)), "w") as f:
+        f.write("{}")
+    old = time.time() - 40 * DAY
+    os.utime(path, (old, old))
+    catalog = FakeCatalog(
+        str(tmp_path),
+        [
+            {
+                "filename": path.name,
+                "show": "KEXP",
+                "mtime": old,
+                "size": 5,
+                "bitrate": 128000,
+            }
+        ],
+    )
+    worker = RetentionWorker(catalog, lambda: {"retention": {"max_age_days": 30}})
+
+    assert worker.run_once() == (1, 0)
+    assert os.listdir(tmp_path) == []
+    assert catalog.removed == [path.name]
+
+
+def test_archive_encodes_under_nice_into_its_own_temp_file(tmp_path, monkeypatch):
+    import retention
+
+    path = tmp_path / "KEXP_20240101_200000.mp3"
+    path.write_bytes(b"x" * 1000)
+    old = time.time() - 40 * DAY
+    os.utime(path, (old, old))
+    calls = []
+
+    def fake_run(command, **kwargs):
+        calls.append((command, kwargs))
+        with open(command[-1], "wb") as f:
+            f.write(b"small")
+        return retention.subprocess.CompletedProcess(command, 0, b"", b"")
+
+    monkeypatch.setattr(retention.subprocess, "run", fake_run)
+    catalog = FakeCatalog(str(tmp_path), [])
+    catalog.update = lambda filename: None
+    worker = RetentionWorker(catalog, dict)
+    settings = {"archive_bitrate": "48k", "cpu_budget": 1}
+    worker.archive({"filename": path.name}, settings)
+    path.write_bytes(b"x" * 1000)
+    os.utime(path, (old, old))
+    worker.archive({"filename": path.name}, settings)
+
+    [(first, kwargs), (second, _)] = calls
+    assert first[:4] == ["nice", "-n", "19", "ffmpeg"]
+    assert "preexec_fn" not in kwargs
+    # Each encode writes to a fresh file next to the recording
+    assert first[-1] != second[-1]
+    assert os.path.dirname(first[-1]) == str(tmp_path)
+    assert os.listdir(tmp_path) == [path.name]
+    assert path.read_bytes() == b"small"
+    assert os.path.getmtime(path) == old
@@ -0,0 +1,108 @@
+import sqlite3
+
+import pytest
+
+from catalog import SEARCH_COLUMNS, Catalog, fts_query, matching_chapters
+
+
+@pytest.fixture
+def catalog(tmp_path, write_mp3):
+    recordings = tmp_path / "recordings"
+    recordings.mkdir()
+    write_mp3(
+        recordings / "KEXP_20240101_200000.mp3",
+        {"TIT2": "Morning Jazz", "TPE1": "Alice", "TCON": "Jazz"},
+        mtime=1_704_139_200,
+    )
+    write_mp3(
+        recordings / "WFMU_20240102_200000.mp3",
+        {"TIT2": "Freeform", "TPE1": "Bob", "COMM": "jazz standards tonight"},
+        mtime=1_704_225_600,
+    )
+    catalog = Catalog(str(tmp_path / "catalog.db"), str(recordings))
+    catalog.refresh(force=True)
+    return catalog
+
+
+def test_fts_query_quotes_terms_and_matches_last_as_prefix():
+    assert fts_query("") == ""
+    assert fts_query("miles da") == '"miles" "da"*'
+    assert fts_query('say "hi"') == '"say" """hi"""*'
+
+
+def test_title_matches_rank_above_comments(catalog):
+    results, total = catalog.search("jazz")
+    assert total == 2
+    assert [r["show"] for r in results] == ["KEXP", "WFMU"]
+
+
+def test_search_by_prefix_show_and_date(catalog):
+    assert [r["show"] for r in catalog.search("ali")[0]] == ["KEXP"]
+    assert [r["show"] for r in catalog.search("wfmu")[0]] == ["WFMU"]
+    assert catalog.search("nothing matches")[1] == 0
+
+
+def test_search_pages(catalog):
+    first, total = catalog.search("jazz", limit=1)
+    second, _ = catalog.search("jazz", limit=1, offset=1)
+    assert total == 2
+    assert [r["show"] for r in first + second] == ["KEXP", "WFMU"]
+
+
+def test_index_follows_tag_changes(catalog, tmp_path, write_mp3):
+    path = tmp_path / "recordings" / "KEXP_20240101_200000.mp3"
+    write_mp3(path, {"TIT2": "Evening Blues"})
+    catalog.update(path.name)
+    assert catalog.search("morning")[1] == 0
+    assert [r["show"] for r in catalog.search("blues")[0]] == ["KEXP"]
+
+    catalog.remove(path.name)
+    assert catalog.search("blues")[1] == 0
+
+
+def test_matching_chapters():
+    chapters = [
+        {"start": 0, "end": 60, "title": "Miles Davis - So What"},
+        {"start": 60, "end": 120, "title": "John Coltrane - Naima"},
+    ]
+    assert matching_chapters(chapters, "so what") == chapters[:1]
+    assert matching_chapters(chapters, "") == []
+
+
+def test_search_index_is_rebuilt_when_its_columns_change(tmp_path, write_mp3):
+    db_path = tmp_path / "catalog.db"
+    recordings = tmp_path / "recordings"
+    recordings.mkdir()
+    write_mp3(recordings / "KEXP_20240101_200000.mp3", {"TIT2": "Old Show"})
+    Catalog(str(db_path), str(recordings)).refresh(force=True)
+    # An index from before a column was added
+    conn = sqlite3.connect(db_path)
+    conn.executescript(
+        """
+        DROP TABLE recordings_fts;
+        CREATE VIRTUAL TABLE recordings_fts USING fts5(show, title);
+        """
+    )
+    conn.commit()
+    conn.close()
+
+    catalog = Catalog(str(db_path), str(recordings))
+    columns = [
+        row[1]
+        for row in catalog._connect().execute("PRAGMA table_info(recordings_fts)")
+    ]
+    assert columns == SEARCH_COLUMNS
+    # Existing rows are indexed straight away
+    assert catalog.search("old show", limit=1)[1] == 1
+
+
+def test_search_endpoint(client, configure, write_mp3):
+    config = configure()
+    write_mp3(
+        f"{config['output_dir']}/KEXP_20240101_200000.mp3", {"TIT2": "Morning Jazz"}
+    )
+    response = client.get("/recordings/search?q=jazz&per_page=10")
+    data = response.get_json()
+    assert data["total"] == 1
+    assert data["per_page"] == 10
+    assert data["results"][0]["filename"] == "KEXP_20240101_200000.mp3"
@@ -0,0 +1,105 @@
+import http.server
+import threading
+
+import pytest
+
+from stream_probe import StreamProber, looks_like_audio
+
+MP3_BYTES = b"\xff\xfb\x90\x64" + b"\x00" * 4096
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    hits = {}
+
+    def do_GET(self):
+        Handler.hits[self.path] = Handler.hits.get(self.path, 0) + 1
+        if self.path == "/redirect":
+            self.send_response(302)
+            self.send_header("Location", "/stream")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif self.path in ("/stream", "/unlabelled"):
+            self.send_response(200)
+            content_type = "audio/mpeg" if self.path == "/stream" else "text/plain"
+            self.send_header("Content-Type", content_type)
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.wfile.write(MP3_BYTES)
+        elif self.path == "/page":
+            body = b"<html>not a stream</html>"
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    Handler.hits = {}
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def prober():
+    return StreamProber(timeout=5, retries=0)
+
+
+def test_looks_like_audio():
+    assert looks_like_audio(b"ID3\x04\x00")
+    assert looks_like_audio(b"OggS\x00")
+    assert looks_like_audio(b"junk" + MP3_BYTES)
+    assert not looks_like_audio(b"<html></html>")
+
+
+def test_redirects_are_followed_to_the_final_url(server, prober):
+    result = prober.check_one(f"{server}/redirect")
+    assert result.ok
+    assert result.status == 200
+    assert result.final_url == f"{server}/stream"
+
+
+def test_audio_without_an_audio_content_type_is_sniffed(server, prober):
+    result = prober.check_one(f"{server}/unlabelled")
+    assert result.ok
+    assert result.sniffed_audio
+
+
+def test_pages_and_errors_are_not_ok(server, prober):
+    results = prober.check([f"{server}/page", f"{server}/missing"])
+    page = results[f"{server}/page"]
+    assert not page.ok
+    assert page.status == 200
+    assert "Not an audio stream" in page.summary
+    assert results[f"{server}/missing"].status == 404
+
+
+def test_connection_errors_are_reported(prober):
+    result = prober.check_one("http://127.0.0.1:9/stream")
+    assert not result.ok
+    assert result.error
+
+
+def test_duplicates_are_probed_once_and_results_cached(server, prober):
+    url = f"{server}/stream"
+    results = prober.check([url, url])
+    assert list(results) == [url]
+    assert prober.check_one(url) is results[url]
+    assert Handler.hits["/stream"] == 1
+
+    # max_age=0 forces a fresh probe
+    prober.check_one(url, max_age=0)
+    assert Handler.hits["/stream"] == 2
@@ -0,0 +1,85 @@
+import time
+
+from catalog import Catalog
+from chapters import ChapterCollector
+from traces import RecordingTrace
+
+
+def test_throughput_is_sampled_from_ffmpeg_progress(wait_until):
+    collector = ChapterCollector()
+    trace = RecordingTrace("KEXP", "http://127.0.0.1:9/live", 60)
+    trace.watch(collector, interval=1)
+    collector.feed_line("[info] size=      32KiB time=00:00:02.00 bitrate= 131.1kbits/s")
+    wait_until(lambda: trace.data["throughput"])
+    trace.failed("stopped")
+
+    [[elapsed, rate]] = trace.data["throughput"]
+    assert (elapsed, rate) == (1, 32 * 1024)
+
+
+def test_input_open_time():
+    trace = RecordingTrace("KEXP", "http://127.0.0.1:9/live", 60)
+    trace.input_opened(trace.started + 0.25)
+    assert trace.data["input_open_ms"] == 250.0
+
+
+def test_connection_timings_come_from_the_capture():
+    collector = ChapterCollector()
+    collector.events = {
+        "started": 10.0, "connecting": 10.02, "connected": 10.05, "first_data": 10.3,
+    }
+    trace = RecordingTrace("KEXP", "http://kexp.example/live", 60)
+    trace.capture_timings(collector)
+    assert trace.data["dns_ms"] == 20.0
+    assert trace.data["connect_ms"] == 30.0
+    assert trace.data["first_byte_ms"] == 250.0
+
+    # Connected to the pre-flight address, so ffmpeg did no lookup
+    trace = RecordingTrace("KEXP", "http://kexp.example/live", 60)
+    trace.data["address"] = "127.0.0.1"
+    trace.capture_timings(collector)
+    assert trace.data["dns_ms"] is None
+    assert trace.data["connect_ms"] == 30.0
+
+    collector = ChapterCollector()
+    collector.events = {"started": 10.0, "connecting": 10.02}
+    collector.network_error = "Connection to tcp://127.0.0.1:9 failed: Connection refused"
+    trace = RecordingTrace("KEXP", "http://127.0.0.1:9/live", 60)
+    trace.capture_timings(collector)
+    assert trace.data["connect_ms"] is None
+    assert trace.data["first_byte_ms"] is None
+    assert trace.data["network_error"] == collector.network_error
+
+
+def test_traces_are_stored_and_summarized(tmp_path):
+    catalog = Catalog(str(tmp_path / "catalog.db"), str(tmp_path))
+    trace = RecordingTrace("KEXP", "http://127.0.0.1:9/live", 60, time.time() - 2)
+    trace.data["exit_reason"] = "completed"
+    trace.input_opened(trace.started + 0.1)
+    trace.save(catalog, "KEXP_20240101_200000.mp3")
+
+    assert catalog.get_trace("KEXP_20240101_200000.mp3")["input_open_ms"] == 100.0
+    assert catalog.get_trace("missing.mp3") is None
+    [summary] = catalog.trace_summary()
+    assert summary["show"] == "KEXP"
+    assert summary["avg_input_open_ms"] == 100.0
+    assert summary["not_completed"] == 0
+
+
+def test_trace_page(client, configure):
+    import app
+
+    configure()
+    client.get("/export_recordings")  # sets the app up
+    trace = RecordingTrace("KEXP", "http://127.0.0.1:9/live", 60)
+    trace.input_opened(trace.started + 0.1)
+    trace.data["address"] = "127.0.0.1"
+    trace.data["throughput"] = [[10, 16000], [20, 16384]]
+    trace.save(app.catalog, "KEXP_20240101_200000.mp3")
+
+    response = client.get("/trace/KEXP_20240101_200000.mp3")
+    assert response.status_code == 200
+    assert b"Input opened" in response.data
+    assert b"None, connected to 127.0.0.1" in response.data
+    assert b"100.0 ms" in response.data
+    assert b"16,384" in response.data
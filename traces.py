@@ -0,0 +1,136 @@
+import logging
+import os
+import signal
+import threading
+import time
+
+
+# A recording this much shorter than requested counts as cut short
+SHORT_TOLERANCE = 0.95
+THROUGHPUT_INTERVAL = 10
+
+
+class RecordingTrace:
+    """What happened during one capture: timings, throughput and resources.
+
+    ``data`` is stored in the catalog next to the recording, see
+    ``Catalog.save_trace``.
+    """
+
+    def __init__(self, show, url, duration, scheduled_at=None, partial=False):
+        self.started = time.monotonic()
+        started_at = time.time()
+        self.data = {
+            "show": show,
+            "url": url,
+            "duration": duration,
+            "partial": partial,
+            "scheduled_at": scheduled_at,
+            "started_at": started_at,
+            "start_lag": (
+                round(started_at - scheduled_at, 3) if scheduled_at else None
+            ),
+            # Set when the capture connected to the pre-flight address
+            "address": None,
+            "dns_ms": None,
+            "connect_ms": None,
+            "first_byte_ms": None,
+            "input_open_ms": None,
+            "throughput": [],
+            "cpu_user": None,
+            "cpu_system": None,
+            "peak_rss_mb": None,
+            "recorded_seconds": None,
+            "tagging_ms": None,
+            "exit_reason": None,
+            "returncode": None,
+        }
+        self._stop = threading.Event()
+
+    def capture_timings(self, collector):
+        """Connection timings from ffmpeg's own log, read by ``collector``.
+
+        ``dns_ms`` runs from ffmpeg's first line to its first connection
+        attempt (None when it connected to the pre-flight address, with no
+        lookup), ``connect_ms`` to the connection and ``first_byte_ms`` on
+        to the first line from the demuxer, once the response had started
+        to arrive. Each is None if ffmpeg didn't get that far.
+        """
+        events = collector.events
+
+        def between(start, end):
+            if start in events and end in events:
+                return round((events[end] - events[start]) * 1000, 1)
+            return None
+
+        if self.data["address"] is None:
+            self.data["dns_ms"] = between("started", "connecting")
+        self.data["connect_ms"] = between("connecting", "connected")
+        self.data["first_byte_ms"] = between("connected", "first_data")
+        if collector.network_error:
+            self.data["network_error"] = collector.network_error
+        self.input_opened(collector.opened_at)
+
+    def input_opened(self, opened_at):
+        """``opened_at`` is the monotonic time ffmpeg reported its input.
+
+        By then ffmpeg has connected, had the HTTP response and probed enough
+        audio to identify the format, so this is later than the first byte.
+        """
+        if opened_at is not None:
+            elapsed = opened_at - self.started
+            self.data["input_open_ms"] = round(elapsed * 1000, 1)
+
+    def watch(self, collector, interval=THROUGHPUT_INTERVAL):
+        """Sample the bytes ffmpeg records per second until ``finish``.
+
+        ``collector`` is the ``ChapterCollector`` reading ffmpeg's output;
+        its ``output_bytes`` follows ffmpeg's progress reports.
+        """
+        threading.Thread(
+            target=self._sample_throughput, args=(collector, interval), daemon=True
+        ).start()
+
+    def _sample_throughput(self, collector, interval):
+        last = collector.output_bytes
+        while not self._stop.wait(interval):
+            written = collector.output_bytes
+            elapsed = round(time.monotonic() - self.started)
+            self.data["throughput"].append([elapsed, (written - last) // interval])
+            last = written
+
+    def finish(self, status, usage):
+        """Record ffmpeg's exit from ``os.wait4``'s status and rusage."""
+        self._stop.set()
+        self.data["returncode"] = os.waitstatus_to_exitcode(status)
+        self.data["cpu_user"] = round(usage.ru_utime, 2)
+        self.data["cpu_system"] = round(usage.ru_stime, 2)
+        # ru_maxrss is in kilobytes on Linux
+        self.data["peak_rss_mb"] = round(usage.ru_maxrss / 1024, 1)
+        if os.WIFSIGNALED(status):
+            name = signal.Signals(os.WTERMSIG(status)).name
+            self.data["exit_reason"] = f"killed by {name}"
+        elif self.data["returncode"] != 0:
+            self.data["exit_reason"] = "ffmpeg error"
+
+    def recorded(self, seconds, tagging_seconds):
+        self.data["recorded_seconds"] = round(seconds, 1)
+        self.data["tagging_ms"] = round(tagging_seconds * 1000, 1)
+        if self.data["exit_reason"] is None:
+            short = seconds < self.data["duration"] * SHORT_TOLERANCE
+            self.data["exit_reason"] = "stream ended early" if short else "completed"
+
+    def failed(self, error):
+        self._stop.set()
+        self.data["error"] = str(error)[-500:]
+        if self.data["exit_reason"] is None:
+            self.data["exit_reason"] = "error"
+
+    def save(self, catalog, filename):
+        self._stop.set()
+        if self.data["exit_reason"] is None:
+            self.data["exit_reason"] = "no output"
+        try:
+            catalog.save_trace(filename, self.data)
+        except Exception as e:
+            logging.error(f"Error saving trace for {filename}: {e}")